@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from .fake_converter import FakeConverter
+from .fake_telegram import FakeTelegram
+from .stats import format_result
+
+SCENARIOS = ['check_limits', 'report', 'registration']
+# Chat that receives the admin notifications
+ADMIN_ID = 1_000_000_000
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m bench',
+                                     description='Run BotMQ against a local converter, Telegram API and database.')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help=f'Scenarios to run: {", ".join(SCENARIOS)} (default: all).')
+    parser.add_argument('--users', type=int, default=10000, help='Number of users (default: 10000).')
+    parser.add_argument('--topics', type=int, default=500, help='Number of topics (default: 500).')
+    parser.add_argument('--limits', type=int, default=4, choices=range(1, 5),
+                        help='Limits per watched topic (default: 4).')
+    parser.add_argument('--watched', type=int, default=5, help='Topics watched per user (default: 5).')
+    parser.add_argument('--cycles', type=int, default=20, help='Measured polling cycles (default: 20).')
+    parser.add_argument('--change', type=float, default=0.1,
+                        help='Share of the topics changing before each cycle (default: 0.1).')
+    parser.add_argument('--burst', type=int, default=500, help='Simultaneous /report commands (default: 500).')
+    parser.add_argument('--new-topics', type=int, default=2000,
+                        help='Topics appearing at once in the registration storm (default: 2000).')
+    parser.add_argument('--db', choices=['memory', 'postgresql'], default='memory',
+                        help='Database backend, postgresql uses the POSTGRES_* variables (default: memory).')
+    parser.add_argument('--telegram-latency', type=float, default=0.0,
+                        help='Seconds added to every Telegram API request (default: 0).')
+    parser.add_argument('--telegram-rate', type=float, default=1000.0,
+                        help='Global and per-chat message rate of the notifier (default: 1000).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data (default: 0).')
+    parser.add_argument('--trace', metavar='PATH', help='Record the bot traces to PATH.')
+    parser.add_argument('--trace-format', choices=['jsonl', 'chrome'], default='jsonl',
+                        help='Format of the recorded traces (default: jsonl).')
+    parser.add_argument('--json', metavar='PATH', help='Also write the results as JSON lines to PATH.')
+    parser.add_argument('--verbose', action='store_true', help='Show the bot logs.')
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f'unknown scenario {name!r}, choose from {", ".join(SCENARIOS)}')
+    return args
+
+def configure(args: argparse.Namespace, converter: FakeConverter, telegram: FakeTelegram) -> None:
+    # botmq reads its configuration on import, so it must be set before
+    os.environ.update({
+        'BOT_TOKEN': '123456:bench',
+        'ADMIN_IDS': str(ADMIN_ID),
+        'SERVER_ADDRESS': converter.host,
+        'SERVER_PORT': str(converter.port),
+        'SERVER_TIMEOUT': '1',
+        'TELEGRAM_API_URL': telegram.url,
+        'TELEGRAM_GLOBAL_RATE': str(args.telegram_rate),
+        'TELEGRAM_CHAT_RATE': str(args.telegram_rate),
+        # Every alarm of a cycle is queued at once, none may be dropped
+        'NOTIFIER_QUEUE_SIZE': str(10 ** 7),
+        'DB_BACKEND': args.db,
+        'TRACE_FILE': args.trace or '',
+        'TRACE_FORMAT': args.trace_format,
+    })
+    for name in ('POSTGRES_HOST', 'POSTGRES_PORT', 'POSTGRES_USER', 'POSTGRES_PASSWORD', 'POSTGRES_DB'):
+        os.environ.setdefault(name, '0' if name == 'POSTGRES_PORT' else '')
+
+async def run(args: argparse.Namespace) -> None:
+    converter = FakeConverter()
+    telegram = FakeTelegram(latency=args.telegram_latency)
+    await converter.start()
+    await telegram.start()
+    configure(args, converter, telegram)
+    from . import scenarios
+    from botmq.loader import converter_client, notifier
+
+    scenarios.setup()
+    scenarios.populate(converter, args.users, args.topics, args.watched, args.limits, args.seed)
+    results = []
+    try:
+        for name in args.scenarios or SCENARIOS:
+            if name == 'check_limits':
+                runs = [scenarios.check_limits(converter, telegram, args.topics, args.cycles, args.change, args.seed)]
+            elif name == 'report':
+                runs = [scenarios.report(telegram, args.users, args.burst, args.seed)]
+            else:
+                runs = [scenarios.registration(converter, telegram, args.new_topics, stream=False),
+                        scenarios.registration(converter, telegram, args.new_topics, stream=True)]
+            for scenario in runs:
+                results.append(await scenario)
+                print(format_result(results[-1]), flush=True)
+    finally:
+        await notifier.stop()
+        await converter_client.close()
+        await scenarios.bot.session.close()
+        await converter.stop()
+        await telegram.stop()
+        scenarios.tracer.close()
+    if args.json:
+        with open(args.json, 'a') as file:
+            for result in results:
+                file.write(json.dumps(result) + '\n')
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import asyncio
+from typing import Dict, Optional
+
+import paho.mqtt.client as mqtt
+from aiohttp import web
+
+from converter.convertible.mqtt import Mqtt
+from converter.server import HttpConverter
+
+class SyntheticClient(Mqtt):
+    """MQTT client fed by the benchmark instead of a broker."""
+    def __init__(self, history_size: int = 256):
+        """
+        Initialize the client, subscribed to every topic.
+
+        Args:
+            history_size (int): Number of numeric samples kept per topic.
+        """
+        super().__init__('localhost', 1883, '', '', ['#'], history_size)
+
+    def run(self) -> None:
+        """Nothing to connect to."""
+        pass
+
+    def publish(self, topic: str, value: str) -> None:
+        """
+        Handle a message as if it was received from the broker.
+
+        Args:
+            topic (str): The topic.
+            value (str): The value.
+        """
+        message = mqtt.MQTTMessage(topic=topic.encode('utf-8'))
+        message.payload = value.encode('utf-8')
+        self.on_message(self.client, None, message)
+
+class FakeConverter:
+    """The converter HTTP interface serving synthetic topics, in the benchmark process."""
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        """
+        Initialize the fake converter.
+
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on, any free port if 0.
+        """
+        self.host: str = host
+        self.port: int = port
+        self.client: SyntheticClient = SyntheticClient()
+        self.server: HttpConverter = HttpConverter(host, port, self.client)
+        self.runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        """Start serving, the chosen port is stored in `port`."""
+        self.server.loop = asyncio.get_running_loop()
+        self.client.add_listener(self.server.on_value)
+        self.runner = web.AppRunner(self.server.create_app(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def publish(self, values: Dict[str, str]) -> None:
+        """
+        Receive new values.
+
+        Args:
+            values (Dict[str, str]): Value by topic.
+        """
+        for topic, value in values.items():
+            self.client.publish(topic, value)
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from aiohttp import web
+
+class FakeTelegram:
+    """
+    Local stand-in for the Telegram Bot API.
+
+    Answers every method the bot calls and records the sent messages. It can add
+    latency to each request and answer every n-th message with 429 Too Many Requests.
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 flood_every: int = 0, retry_after: int = 1):
+        """
+        Initialize the fake API.
+
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on, any free port if 0.
+            latency (float): Seconds added to every request.
+            flood_every (int): Answer every n-th sendMessage with 429, never if 0.
+            retry_after (int): Seconds to wait requested in the 429 answers.
+        """
+        self.host: str = host
+        self.port: int = port
+        self.latency: float = latency
+        self.flood_every: int = flood_every
+        self.retry_after: int = retry_after
+        self.runner: Optional[web.AppRunner] = None
+        self.requests: Counter = Counter()
+        # Receive time, chat ID and text of every accepted message
+        self.messages: List[Tuple[float, int, str]] = []
+
+    @property
+    def url(self) -> str:
+        """Base URL to configure as TELEGRAM_API_URL."""
+        return f'http://{self.host}:{self.port}'
+
+    async def start(self) -> None:
+        """Start serving, the chosen port is stored in `port`."""
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def reset(self) -> None:
+        """Forget the recorded requests and messages."""
+        self.requests.clear()
+        self.messages = []
+
+    def rate(self) -> float:
+        """
+        Return the rate of accepted messages.
+
+        Returns:
+            float: Messages per second between the first and the last one.
+        """
+        if len(self.messages) < 2:
+            return 0.0
+        duration = self.messages[-1][0] - self.messages[0][0]
+        return (len(self.messages) - 1) / duration if duration > 0 else 0.0
+
+    async def handle(self, request):
+        method = request.match_info['method']
+        data = await request.post()
+        self.requests[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method == 'sendMessage':
+            if self.flood_every and self.requests[method] % self.flood_every == 0:
+                return web.json_response({
+                    'ok': False,
+                    'error_code': 429,
+                    'description': f'Too Many Requests: retry after {self.retry_after}',
+                    'parameters': {'retry_after': self.retry_after},
+                })
+            chat_id = int(data['chat_id'])
+            self.messages.append((time.monotonic(), chat_id, data['text']))
+            result = {
+                'message_id': len(self.messages),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': data['text'],
+            }
+        elif method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'BotMQ', 'username': 'botmq_bench_bot'}
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
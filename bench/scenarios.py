@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from aiogram.types import Chat, Message, Update, User
+
+import botmq.handlers
+from botmq import polling
+from botmq.data import config
+from botmq.loader import bot, dp, router, data_base, notifier, topic_values
+from botmq.polling import LIMIT_NAMES
+from botmq.middlewares import HandlerMetricsMiddleware, TracingMiddleware, TracingRequestMiddleware
+from botmq.tracing import tracer
+from botmq.utility.generator import generate_password
+from converter.server import STREAM_QUEUE_SIZE
+
+from .fake_converter import FakeConverter
+from .fake_telegram import FakeTelegram
+from .stats import latency_summary
+
+# Thresholds of the generated limits, values are drawn between 0 and 100
+THRESHOLDS = {'lower_panic': 10, 'lower_limit': 20, 'upper_limit': 80, 'upper_panic': 90}
+# Longest wait for the queued notifications to be sent after a scenario, in seconds
+DRAIN_TIMEOUT = 300
+
+def topic_name(index: int) -> str:
+    return f'bench/{index}'
+
+def db_calls() -> int:
+    return sum(data_base.calls.values())
+
+async def drain() -> None:
+    # Wait for the notifier to send everything queued so far
+    try:
+        await asyncio.wait_for(notifier.queue.join(), DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.warning(f'{notifier.queue.qsize()} notification(s) still queued')
+
+async def polling_cycle() -> None:
+    # One poll of server_polling, without the value stream
+    with tracer.span('poll_cycle'):
+        await polling.sync_values()
+        await polling.add_topics(generate_password)
+        await polling.check_limits()
+
+def populate(converter: FakeConverter, users: int, topics: int, watched: int, limits: int, seed: int) -> None:
+    """
+    Fill the converter and the database, bypassing the query counters.
+
+    Every user joins `watched` random topics and sets the first `limits` limits on each.
+
+    Args:
+        converter (FakeConverter): Converter to publish the topics to.
+        users (int): Number of users.
+        topics (int): Number of topics.
+        watched (int): Number of topics per user.
+        limits (int): Number of limits per watched topic, at most 4.
+        seed (int): Seed of the random choices.
+    """
+    rng = random.Random(seed)
+    names = [topic_name(index) for index in range(topics)]
+    converter.publish({topic: '50' for topic in names})
+    passwords = {topic: f'bench-{topic}' for topic in names}
+    handler = data_base.handler
+    handler.add_groups(passwords)
+    limit_names = [limit_name for limit_name in LIMIT_NAMES if limit_name in THRESHOLDS][:limits]
+    for user_id in range(1, users + 1):
+        for topic in rng.sample(names, min(watched, topics)):
+            handler.add_user(user_id, passwords[topic])
+            for limit_name in limit_names:
+                handler.set_limit(user_id, topic, limit_name, THRESHOLDS[limit_name])
+    logging.warning(f'Populated {users} users watching {watched} of {topics} topics with {limits} limits each')
+
+async def check_limits(converter: FakeConverter, telegram: FakeTelegram, topics: int, cycles: int,
+                       change: float, seed: int) -> Dict[str, Any]:
+    """
+    Measure polling cycles while a share of the topics changes before each one.
+
+    Args:
+        converter (FakeConverter): Converter serving the topics.
+        telegram (FakeTelegram): Telegram API receiving the alarms.
+        topics (int): Number of populated topics.
+        cycles (int): Number of measured cycles.
+        change (float): Share of the topics given a new random value before each cycle.
+        seed (int): Seed of the random values.
+
+    Returns:
+        Dict[str, Any]: Measured values.
+    """
+    rng = random.Random(seed)
+    names = [topic_name(index) for index in range(topics)]
+    telegram.reset()
+    # The first cycle downloads the snapshot and loads the limit index and the alarms
+    calls = db_calls()
+    start_time = time.perf_counter()
+    await polling_cycle()
+    load_time = time.perf_counter() - start_time
+    load_calls = db_calls() - calls
+    durations: List[float] = []
+    queries: List[int] = []
+    for _ in range(cycles):
+        changed = rng.sample(names, int(len(names) * change))
+        converter.publish({topic: str(round(rng.uniform(0, 100), 1)) for topic in changed})
+        calls = db_calls()
+        start_time = time.perf_counter()
+        await polling_cycle()
+        durations.append(time.perf_counter() - start_time)
+        queries.append(db_calls() - calls)
+    await drain()
+    return {
+        'scenario': 'check_limits',
+        'load_ms': round(load_time * 1000, 3),
+        'load_queries': load_calls,
+        'cycle_latency': latency_summary(durations),
+        'queries_per_cycle': {'avg': round(sum(queries) / len(queries), 1) if queries else 0,
+                              'max': max(queries, default=0)},
+        'messages_sent': len(telegram.messages),
+        'messages_per_second': telegram.rate(),
+        'notifier': notifier.metrics(),
+    }
+
+def make_update(update_id: int, user_id: int, text: str) -> Update:
+    user = User(id=user_id, is_bot=False, first_name=f'user{user_id}')
+    message = Message(message_id=update_id, date=datetime.now(), text=text, from_user=user,
+                      chat=Chat(id=user_id, type='private'))
+    return Update(update_id=update_id, message=message)
+
+async def report(telegram: FakeTelegram, users: int, burst: int, seed: int) -> Dict[str, Any]:
+    """
+    Measure a burst of /report commands sent at the same time by different users.
+
+    Args:
+        telegram (FakeTelegram): Telegram API receiving the reports.
+        users (int): Number of populated users.
+        burst (int): Number of simultaneous commands.
+        seed (int): Seed of the chosen users.
+
+    Returns:
+        Dict[str, Any]: Measured values.
+    """
+    rng = random.Random(seed)
+    user_ids = [rng.randint(1, users) for _ in range(burst)]
+    telegram.reset()
+
+    async def send(update_id: int, user_id: int) -> float:
+        start_time = time.perf_counter()
+        await dp.feed_update(bot, make_update(update_id, user_id, '/report'))
+        return time.perf_counter() - start_time
+
+    calls = db_calls()
+    start_time = time.perf_counter()
+    durations = await asyncio.gather(*(send(update_id, user_id) for update_id, user_id in enumerate(user_ids)))
+    total_time = time.perf_counter() - start_time
+    return {
+        'scenario': 'report',
+        'burst': burst,
+        'latency': latency_summary(durations),
+        'reports_per_second': burst / total_time if total_time else 0.0,
+        'queries_per_report': round((db_calls() - calls) / burst, 2) if burst else 0,
+        'messages_sent': len(telegram.messages),
+    }
+
+async def registration(converter: FakeConverter, telegram: FakeTelegram, new_topics: int,
+                       stream: bool, timeout: float = 300) -> Dict[str, Any]:
+    """
+    Measure how long it takes to register a storm of new topics as groups.
+
+    Args:
+        converter (FakeConverter): Converter the new topics appear on.
+        telegram (FakeTelegram): Telegram API receiving the admin notifications.
+        new_topics (int): Number of topics appearing at once.
+        stream (bool): Learn about the topics from the value stream instead of a poll.
+        timeout (float): Longest wait for the registration in seconds.
+
+    Returns:
+        Dict[str, Any]: Measured values.
+    """
+    mode = 'stream' if stream else 'poll'
+    names = [f'storm/{mode}/{index}' for index in range(new_topics)]
+    telegram.reset()
+    listener = None
+    if stream:
+        listener = asyncio.create_task(polling.listen_values(generate_password, config.SERVER_TIMEOUT))
+        # Let the stream connect before the storm
+        await asyncio.sleep(0.5)
+    calls = db_calls()
+    start_time = time.perf_counter()
+    if stream:
+        # A subscriber more than STREAM_QUEUE_SIZE events behind is dropped, and a broker does
+        # not deliver a storm in one go either, so it is published in chunks the stream can take
+        chunk = STREAM_QUEUE_SIZE // 2
+        for start in range(0, len(names), chunk):
+            converter.publish({topic: '1' for topic in names[start:start + chunk]})
+            await asyncio.sleep(0)
+            while any(not queue.empty() for queue in converter.server.subscribers):
+                await asyncio.sleep(0.001)
+    else:
+        converter.publish({topic: '1' for topic in names})
+        await polling.sync_values()
+        await polling.add_topics(generate_password)
+    while not set(names) <= set(data_base.handler.list_groups()):
+        if time.perf_counter() - start_time > timeout:
+            logging.error(f'Registration of {new_topics} topics timed out')
+            break
+        await asyncio.sleep(0.01)
+    duration = time.perf_counter() - start_time
+    queries = db_calls() - calls
+    if listener is not None:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+    await drain()
+    return {
+        'scenario': f'registration ({mode})',
+        'new_topics': new_topics,
+        'duration_ms': round(duration * 1000, 3),
+        'topics_per_second': new_topics / duration if duration else 0.0,
+        'queries': queries,
+        'admin_messages': len(telegram.messages),
+        'mirrored_topics': len(topic_values),
+    }
+
+def setup() -> None:
+    # Same wiring as botmq.__main__, without polling Telegram
+    dp.include_router(router)
+    dp.update.outer_middleware(HandlerMetricsMiddleware())
+    if tracer.enabled:
+        dp.update.outer_middleware(TracingMiddleware())
+        bot.session.middleware(TracingRequestMiddleware())
+    notifier.start()
@@ -0,0 +1,55 @@
+import math
+from typing import Any, Dict, List, Sequence
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """
+    Return a percentile using the nearest-rank method.
+
+    Args:
+        samples (Sequence[float]): Measured values.
+        q (float): Percentile between 0 and 100.
+
+    Returns:
+        float: The percentile, 0 if there are no samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+def latency_summary(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarize durations measured in seconds.
+
+    Args:
+        samples (Sequence[float]): Durations in seconds.
+
+    Returns:
+        Dict[str, float]: Count, then min, p50, p90, p99 and max in milliseconds.
+    """
+    summary = {'count': len(samples)}
+    for name, q in (('min_ms', 0), ('p50_ms', 50), ('p90_ms', 90), ('p99_ms', 99), ('max_ms', 100)):
+        summary[name] = round(percentile(samples, q) * 1000, 3)
+    return summary
+
+def format_result(result: Dict[str, Any]) -> str:
+    """
+    Render a scenario result as aligned text lines.
+
+    Args:
+        result (Dict[str, Any]): Scenario name and measured values, nested one level at most.
+
+    Returns:
+        str: The rendered result.
+    """
+    lines: List[str] = [f'== {result["scenario"]} ==']
+    for key, value in result.items():
+        if key == 'scenario':
+            continue
+        if isinstance(value, dict):
+            value = ', '.join(f'{name}={item}' for name, item in value.items())
+        elif isinstance(value, float):
+            value = f'{value:.2f}'
+        lines.append(f'  {key:<24} {value}')
+    return '\n'.join(lines)
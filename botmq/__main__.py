@@ -2,12 +2,19 @@ import asyncio
 import logging
 logging.basicConfig(level=logging.INFO)
 
+from prometheus_client import REGISTRY, start_http_server
+
 from .utility.generator import generate_password
 from .utility.commands import set_default_commands
 
 from .polling import server_polling
 from .data import config 
-from .loader import data_base, bot, dp, router
+from .loader import data_base, bot, dp, router, converter_client, notifier
+from .loader import limit_index, alarm_tracker, topic_values
+from .utility.db import config_cache
+from .metrics import BotCollector
+from .middlewares import HandlerMetricsMiddleware, TracingMiddleware, TracingRequestMiddleware
+from .tracing import tracer
 
 async def on_startup():
     logging.info('Bot started')
@@ -22,15 +29,28 @@ async def main():
     
     dp.include_router(router)
     dp.startup.register(on_startup)
-    server_task = asyncio.create_task(server_polling(config.SERVER_ADDRESS, 
-                                                     config.SERVER_PORT, 
-                                                     generate_password, 
+    dp.update.outer_middleware(HandlerMetricsMiddleware())
+    if config.METRICS_PORT:
+        REGISTRY.register(BotCollector(notifier, config_cache, limit_index, alarm_tracker, topic_values))
+        start_http_server(config.METRICS_PORT)
+        logging.info(f'Metrics are served on port {config.METRICS_PORT}')
+    if tracer.enabled:
+        dp.update.outer_middleware(TracingMiddleware())
+        bot.session.middleware(TracingRequestMiddleware())
+        logging.info(f'Traces are written to {config.TRACE_FILE}')
+    notifier.start()
+    server_task = asyncio.create_task(server_polling(generate_password, 
                                                      config.SERVER_TIMEOUT))
     try:
         await dp.start_polling(bot, handle_signals=False)
         await server_task
     except KeyboardInterrupt as e:
         await dp.stop_polling()
+    finally:
+        server_task.cancel()
+        await notifier.stop()
+        await converter_client.close()
+        tracer.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,124 @@
+import logging
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from .utility.limits import LIMIT_DIRECTIONS
+
+# Transitions returned by AlarmTracker.update
+RAISED = 'raised'
+ACTIVE = 'active'
+CLEARED = 'cleared'
+
+AlarmKey = Tuple[int, str, str]
+
+class AlarmTracker:
+    """
+    State of every (user, topic, limit) alarm.
+
+    An alarm is raised when the value crosses the limit, reported again while it stays
+    active at most once per re-notify interval, and cleared once the value is back
+    inside the limit by more than the hysteresis band. Active alarms are persisted in
+    the users' configs as the time they were last reported.
+    """
+    def __init__(self, hysteresis: float = 0.0, renotify_interval: float = 0.0):
+        """
+        Initialize an empty tracker.
+
+        Args:
+            hysteresis (float): How far inside the limit the value must get to clear the alarm.
+            renotify_interval (float): Minimum time in seconds between reports of an active alarm,
+                                       0 to report it only when raised.
+        """
+        self.hysteresis: float = hysteresis
+        self.renotify_interval: float = renotify_interval
+        self.loaded: bool = False
+        # Time the alarm was last reported, by alarm key
+        self.alarms: Dict[AlarmKey, float] = {}
+
+    async def load(self, data_base) -> None:
+        """
+        Restore the active alarms persisted in the users' configs.
+
+        Args:
+            data_base: Database context used to read the users' configs.
+        """
+        self.alarms = {}
+        for user_id, topic, limit_name, notified_at in await data_base.list_alarms():
+            if limit_name not in LIMIT_DIRECTIONS:
+                logging.error(f'Error: alarm of unknown limit {limit_name} of user {user_id} for topic {topic}')
+                continue
+            try:
+                self.alarms[(user_id, topic, limit_name)] = float(notified_at)
+            except (ValueError, TypeError):
+                logging.error(f'Error: {limit_name} alarm of user {user_id} for topic {topic} has no valid time')
+        self.loaded = True
+        logging.info(f'Alarm tracker loaded: {len(self.alarms)} active alarms')
+
+    async def save(self, data_base, keys: Iterable[AlarmKey]) -> None:
+        """
+        Persist the state of alarms after their transitions, all in one write.
+
+        Args:
+            data_base: Database context used to write the users' configs.
+            keys (Iterable[AlarmKey]): (user ID, topic, limit name) of each alarm.
+        """
+        alarms = []
+        for key in dict.fromkeys(keys):
+            notified_at = self.alarms.get(key, None)
+            alarms.append((*key, None if notified_at is None else int(notified_at)))
+        if alarms:
+            await data_base.save_alarms(alarms)
+
+    def restore(self, key: AlarmKey, notified_at: Optional[float]) -> None:
+        """
+        Put an alarm back in its state before a transition that could not be saved,
+        so the transition is detected and reported again on the next check.
+
+        Args:
+            key (AlarmKey): (user ID, topic, limit name) of the alarm.
+            notified_at (Optional[float]): Time the alarm was last reported, None if it was not active.
+        """
+        if notified_at is None:
+            self.alarms.pop(key, None)
+        else:
+            self.alarms[key] = notified_at
+
+    def update(self, user_id: int, topic: str, limit_name: str, threshold: float, value: float,
+               now: Optional[float] = None) -> Optional[str]:
+        """
+        Evaluate a limit against the current value.
+
+        Args:
+            user_id (int): The ID of the user.
+            topic (str): The topic.
+            limit_name (str): The name of the limit, one of LIMIT_DIRECTIONS.
+            threshold (float): The limit value.
+            value (float): The current value of the topic.
+            now (Optional[float]): Current time, time.time() if None.
+
+        Returns:
+            Optional[str]: RAISED, ACTIVE or CLEARED if the alarm has to be reported, None otherwise.
+
+        Raises:
+            ValueError: If the limit name is unknown.
+        """
+        key = (user_id, topic, limit_name)
+        if now is None:
+            now = time.time()
+        if limit_name not in LIMIT_DIRECTIONS:
+            raise ValueError(f'Unknown limit {limit_name}')
+        lower = LIMIT_DIRECTIONS[limit_name] < 0
+        notified_at = self.alarms.get(key, None)
+        if notified_at is None:
+            if (lower and value < threshold) or (not lower and value > threshold):
+                self.alarms[key] = now
+                return RAISED
+            return None
+        if (lower and value >= threshold + self.hysteresis) or \
+           (not lower and value <= threshold - self.hysteresis):
+            del self.alarms[key]
+            return CLEARED
+        if self.renotify_interval > 0 and now - notified_at >= self.renotify_interval:
+            self.alarms[key] = now
+            return ACTIVE
+        return None
@@ -1,4 +1,12 @@
+import os
+
 from environs import Env
+from marshmallow import ValidationError
+from marshmallow.validate import Range
+
+def writable_directory(path: str) -> None:
+    if not os.path.isdir(path) or not os.access(path, os.W_OK):
+        raise ValidationError(f'{path} is not a writable directory')
 
 env = Env()
 env.read_env()
@@ -9,9 +17,39 @@ ADMIN_IDS = env.str('ADMIN_IDS', '').split(', ') if env.str('ADMIN_IDS', '') els
 SERVER_ADDRESS: str = env.str('SERVER_ADDRESS')
 SERVER_PORT: int = env.int('SERVER_PORT')
 SERVER_TIMEOUT: int = env.int('SERVER_TIMEOUT')
+SERVER_POOL_SIZE: int = env.int('SERVER_POOL_SIZE', 10)
+SERVER_REQUEST_TIMEOUT: float = env.float('SERVER_REQUEST_TIMEOUT', 10.0)
+# Maximum number of topics requested at once for /report
+REPORT_BATCH_SIZE: int = env.int('REPORT_BATCH_SIZE', 500, validate=Range(min=1))
+# New topics seen on the value stream are registered in batches of this size, or after this delay in seconds
+REGISTER_BATCH_SIZE: int = env.int('REGISTER_BATCH_SIZE', 500, validate=Range(min=1))
+REGISTER_DELAY: float = env.float('REGISTER_DELAY', 1.0, validate=Range(min=0, min_inclusive=False))
+ALARM_HYSTERESIS: float = env.float('ALARM_HYSTERESIS', 0.0)
+ALARM_RENOTIFY_INTERVAL: float = env.float('ALARM_RENOTIFY_INTERVAL', 0.0)
+DIGEST_MAX_ALARMS: int = env.int('DIGEST_MAX_ALARMS', 50)
+NOTIFIER_WORKERS: int = env.int('NOTIFIER_WORKERS', 8)
+# Messages queued beyond this many are dropped
+NOTIFIER_QUEUE_SIZE: int = env.int('NOTIFIER_QUEUE_SIZE', 10000, validate=Range(min=1))
+TELEGRAM_GLOBAL_RATE: float = env.float('TELEGRAM_GLOBAL_RATE', 30.0)
+TELEGRAM_CHAT_RATE: float = env.float('TELEGRAM_CHAT_RATE', 1.0)
+# Base URL of a self-hosted Telegram Bot API server, the official one if empty
+TELEGRAM_API_URL: str = env.str('TELEGRAM_API_URL', '')
+# Port of the Prometheus metrics listener, 0 to disable it
+METRICS_PORT: int = env.int('METRICS_PORT', 0)
+# File the traces are written to, tracing is disabled if empty
+TRACE_FILE: str = env.str('TRACE_FILE', '')
+# 'jsonl', or 'chrome' for chrome://tracing and Perfetto
+TRACE_FORMAT: str = env.str('TRACE_FORMAT', 'jsonl')
+# Directory the profiles collected with /profile are saved to
+PROFILE_DIR: str = env.str('PROFILE_DIR', '.', validate=writable_directory)
+USER_CONFIG_CACHE_SIZE: int = env.int('USER_CONFIG_CACHE_SIZE', 1024)
 
+# 'postgresql', or 'memory' to keep everything in process memory
+DB_BACKEND: str = env.str('DB_BACKEND', 'postgresql')
 POSTGRES_HOST: str = env.str("POSTGRES_HOST")
 POSTGRES_PORT: int = env.int("POSTGRES_PORT")
 POSTGRES_USER: str = env.str("POSTGRES_USER")
 POSTGRES_PASSWORD: str = env.str("POSTGRES_PASSWORD")
-POSTGRES_DB: str = env.str("POSTGRES_DB")
\ No newline at end of file
+POSTGRES_DB: str = env.str("POSTGRES_DB")
+POSTGRES_POOL_MIN: int = env.int("POSTGRES_POOL_MIN", 1)
+POSTGRES_POOL_MAX: int = env.int("POSTGRES_POOL_MAX", 5)
\ No newline at end of file
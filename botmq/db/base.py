@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 
 class Base(ABC):
     """
@@ -31,6 +31,19 @@ class Base(ABC):
         """
         pass
 
+    @abstractmethod
+    def add_groups(self, groups: Dict[str, str]) -> List[str]:
+        """
+        Add several groups at once, skipping the ones that already exist.
+
+        Args:
+            groups (Dict[str, str]): Password by group name.
+
+        Returns:
+            List[str]: Names of the groups that were added.
+        """
+        pass
+
     @abstractmethod
     def add_user(self, user_id: int, password: str):
         """
@@ -132,3 +145,111 @@ class Base(ABC):
             Optional[Dict]: The configuration settings of the user.
         """
         pass
+
+    @abstractmethod
+    def set_config_value(self, user_id: int, path: List[str], value: Any):
+        """
+        Set a single value in a user's configuration, creating missing parent objects.
+
+        Args:
+            user_id (int): The ID of the user.
+            path (List[str]): Keys leading to the value.
+            value (Any): The value, must be JSON serializable.
+        """
+        pass
+
+    @abstractmethod
+    def delete_config_value(self, user_id: int, path: List[str]):
+        """
+        Delete a single value from a user's configuration.
+
+        Args:
+            user_id (int): The ID of the user.
+            path (List[str]): Keys leading to the value.
+        """
+        pass
+
+    @abstractmethod
+    def set_limit(self, user_id: int, topic: str, limit_name: str, value: Any):
+        """
+        Set a user's limit on a topic.
+
+        Args:
+            user_id (int): The ID of the user.
+            topic (str): The topic.
+            limit_name (str): The name of the limit.
+            value (Any): The limit value, must be convertible to a number.
+        """
+        pass
+
+    @abstractmethod
+    def get_limits(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Return all limits of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Limit values by topic and limit name.
+        """
+        pass
+
+    @abstractmethod
+    def list_limits(self, topics: Optional[List[str]] = None) -> List[Tuple[int, str, str, Any]]:
+        """
+        Return the limits of all users, optionally only on the given topics.
+
+        Args:
+            topics (Optional[List[str]]): Topics to return limits for, all topics if None.
+
+        Returns:
+            List[Tuple[int, str, str, Any]]: User ID, topic, limit name and value of each limit.
+        """
+        pass
+
+    @abstractmethod
+    def list_alarms(self) -> List[Tuple[int, str, str, Any]]:
+        """
+        Return the active alarms persisted in the configs of all users.
+
+        Returns:
+            List[Tuple[int, str, str, Any]]: User ID, topic, limit name and last report time of each alarm.
+        """
+        pass
+
+    @abstractmethod
+    def save_alarms(self, alarms: List[Tuple[int, str, str, Optional[int]]]):
+        """
+        Persist the state of several alarms in the configs of their users at once.
+
+        Args:
+            alarms (List[Tuple[int, str, str, Optional[int]]]): User ID, topic, limit name and last report
+                                                               time of each alarm, None to delete it.
+        """
+        pass
+
+    @abstractmethod
+    def set_rename(self, user_id: int, topic: str, name: str):
+        """
+        Set the name a user sees for a topic.
+
+        Args:
+            user_id (int): The ID of the user.
+            topic (str): The topic.
+            name (str): The new name of the topic.
+        """
+        pass
+
+    @abstractmethod
+    def get_renames(self, user_id: int) -> Dict[str, str]:
+        """
+        Return all renames of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Dict[str, str]: New name by topic.
+        """
+        pass
@@ -1,4 +1,12 @@
+import asyncio
+import functools
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
 from .base import Base 
+from ..metrics import DB_ERRORS, DB_QUERY_DURATION
+from ..tracing import tracer
 
 class Context:
     """
@@ -63,3 +71,84 @@ class Context:
             return getattr(self.handler, attr)
         else:
             raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{attr}'")
+
+class AsyncContext(Context):
+    """
+    Asynchronous context manager for handling database operations.
+
+    Every method of the handler is run in a thread pool and returned as a coroutine,
+    so blocking database drivers do not stall the event loop.
+
+    Attributes:
+        handler (Base): An instance of a class that inherits from the Base abstract class,
+                        responsible for database operations.
+        executor (ThreadPoolExecutor): Thread pool the handler methods are run in.
+        calls (Counter): Number of calls of each handler method.
+    """
+
+    def __init__(self, handler: Base, max_workers: int = 1):
+        """
+        Initialize the AsyncContext manager with a database handler.
+
+        Args:
+            handler (Base): An instance of a class that implements the Base abstract class.
+            max_workers (int): Number of operations that may run at the same time.
+                               Must be 1 unless the handler is safe to use from several threads.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+        self.calls = Counter()
+        super().__init__(handler)
+
+    async def __aenter__(self):
+        """
+        Enter the asynchronous runtime context related to this object.
+
+        Returns:
+            AsyncContext: The instance of the context manager.
+        """
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """
+        Exit the asynchronous runtime context related to this object.
+
+        Args:
+            exc_type (type): The exception type, if any.
+            exc_value (Exception): The exception instance, if any.
+            traceback (TracebackType): The traceback object, if any.
+        """
+        await self.close()
+
+    def __getattr__(self, attr):
+        """
+        Delegate attribute access to the handler, wrapping its methods into coroutines.
+
+        Args:
+            attr (str): The name of the attribute.
+
+        Returns:
+            Any: The attribute value from the handler, or a coroutine function
+                 running the handler method in the thread pool.
+
+        Raises:
+            AttributeError: If the attribute is not found in the handler.
+        """
+        value = super().__getattr__(attr)
+        if not callable(value):
+            return value
+
+        @functools.wraps(value)
+        async def method(*args, **kwargs):
+            self.calls[attr] += 1
+            loop = asyncio.get_running_loop()
+            start_time = time.perf_counter()
+            try:
+                with tracer.span(f'db.{attr}'):
+                    return await loop.run_in_executor(self.executor, functools.partial(value, *args, **kwargs))
+            except Exception:
+                DB_ERRORS.labels(attr).inc()
+                raise
+            finally:
+                DB_QUERY_DURATION.labels(attr).observe(time.perf_counter() - start_time)
+        return method
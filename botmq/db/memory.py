@@ -0,0 +1,355 @@
+import copy
+import logging
+import threading
+from decimal import Decimal
+from hashlib import sha256
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .base import Base
+
+class Memory(Base):
+    """
+    Derived class keeping the whole database in process memory.
+
+    Nothing is persisted, the data is lost when the process exits. Meant for local
+    runs and benchmarks without a PostgreSQL server. Operations are serialized by a
+    lock, so the handler may be used from several threads.
+    """
+    def __init__(self):
+        """Initialize an empty database."""
+        self.lock: threading.Lock = threading.Lock()
+        # Hashed password by group name
+        self.groups: Dict[str, str] = {}
+        # Config by user ID
+        self.users: Dict[int, Optional[Dict]] = {}
+        self.user_groups: Dict[int, List[str]] = {}
+        # Limit value by user ID, topic and limit name
+        self.limits: Dict[int, Dict[str, Dict[str, Decimal]]] = {}
+        self.renames: Dict[int, Dict[str, str]] = {}
+
+    def connect(self) -> None:
+        """Connect to the database."""
+        logging.info('Using the in-memory database')
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        pass
+
+    def create_table(self) -> None:
+        """Create new table(s) in the database."""
+        pass
+
+    def add_group(self, group_name: str, password: str) -> None:
+        """
+        Add a new group to the table.
+
+        Args:
+            group_name (str): The name of the group.
+            password (str): The password for the group.
+
+        Raises:
+            ValueError: If the group already exists.
+        """
+        with self.lock:
+            if group_name in self.groups:
+                raise ValueError(f'Group {group_name} already exists')
+            self.groups[group_name] = sha256(password.encode()).hexdigest()
+
+    def add_groups(self, groups: Dict[str, str]) -> List[str]:
+        """
+        Add several groups at once, skipping the ones that already exist.
+
+        Args:
+            groups (Dict[str, str]): Password by group name.
+
+        Returns:
+            List[str]: Names of the groups that were added.
+        """
+        added_groups = []
+        with self.lock:
+            for group_name, password in groups.items():
+                if group_name not in self.groups:
+                    self.groups[group_name] = sha256(password.encode()).hexdigest()
+                    added_groups.append(group_name)
+        return added_groups
+
+    def add_user(self, user_id: int, password: str) -> str:
+        """
+        Add a user to a group if the passwords match.
+
+        Args:
+            user_id (int): The ID of the user.
+            password (str): The password of the user.
+
+        Returns:
+            str: Result message indicating the outcome.
+        """
+        hashed_password = sha256(password.encode()).hexdigest()
+        with self.lock:
+            for group_name, group_password in self.groups.items():
+                if group_password != hashed_password:
+                    continue
+                if user_id in self.users:
+                    result_message = f"User added to group '{group_name}'"
+                else:
+                    self.users[user_id] = None
+                    result_message = f"User created and added to group '{group_name}'"
+                user_groups = self.user_groups.setdefault(user_id, [])
+                if group_name not in user_groups:
+                    user_groups.append(group_name)
+                logging.info(result_message)
+                return result_message
+        result_message = 'No matching group found for the provided password'
+        logging.info(result_message)
+        return result_message
+
+    def delete_group(self, group_name: str) -> None:
+        """
+        Delete a group by its name.
+
+        Args:
+            group_name (str): The name of the group to delete.
+        """
+        with self.lock:
+            for user_groups in self.user_groups.values():
+                if group_name in user_groups:
+                    user_groups.remove(group_name)
+            self.groups.pop(group_name, None)
+
+    def delete_user(self, user_id: int, group_name: str) -> None:
+        """
+        Delete a user from a group, and the user itself if it is in no group anymore.
+
+        Args:
+            user_id (int): The ID of the user.
+            group_name (str): The name of the group.
+        """
+        with self.lock:
+            user_groups = self.user_groups.get(user_id, [])
+            if group_name in user_groups:
+                user_groups.remove(group_name)
+            if not user_groups:
+                self.user_groups.pop(user_id, None)
+                self.users.pop(user_id, None)
+                self.renames.pop(user_id, None)
+                self.limits.pop(user_id, None)
+
+    def get_user(self, group_name: str) -> Optional[List[int]]:
+        """
+        Return user ID(s) from a group name.
+
+        Args:
+            group_name (str): The name of the group.
+
+        Returns:
+            List[int]: List of user IDs in the group.
+        """
+        with self.lock:
+            return [user_id for user_id, user_groups in self.user_groups.items() if group_name in user_groups]
+
+    def get_group(self, user_id: int) -> List[str]:
+        """
+        Return group name(s) by user ID.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            List[str]: List of group names the user belongs to.
+        """
+        with self.lock:
+            return list(self.user_groups.get(user_id, []))
+
+    def list_groups(self) -> List[str]:
+        """
+        Return a list of all groups.
+
+        Returns:
+            List[str]: List of all group names.
+        """
+        with self.lock:
+            return list(self.groups)
+
+    def list_users(self) -> List[int]:
+        """
+        Return a list of all users.
+
+        Returns:
+            List[int]: List of all user IDs.
+        """
+        with self.lock:
+            return list(self.users)
+
+    def set_config(self, user_id: int, config: Dict) -> None:
+        """
+        Set a user's configuration by user ID.
+
+        Args:
+            user_id (int): The ID of the user.
+            config (Dict): The configuration settings.
+        """
+        with self.lock:
+            if user_id in self.users:
+                self.users[user_id] = copy.deepcopy(config)
+
+    def get_config(self, user_id: int) -> Optional[Dict]:
+        """
+        Return a user's configuration by user ID.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Optional[Dict]: The configuration settings of the user.
+        """
+        with self.lock:
+            if user_id not in self.users:
+                logging.error(f'No config found for user {user_id}')
+                return None
+            return copy.deepcopy(self.users[user_id])
+
+    def set_config_value(self, user_id: int, path: List[str], value: Any) -> None:
+        """
+        Set a single value in a user's configuration, creating missing parent objects.
+
+        Args:
+            user_id (int): The ID of the user.
+            path (List[str]): Keys leading to the value.
+            value (Any): The value, must be JSON serializable.
+        """
+        with self.lock:
+            if user_id not in self.users:
+                return
+            if self.users[user_id] is None:
+                self.users[user_id] = {}
+            node = self.users[user_id]
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = copy.deepcopy(value)
+
+    def delete_config_value(self, user_id: int, path: List[str]) -> None:
+        """
+        Delete a single value from a user's configuration.
+
+        Args:
+            user_id (int): The ID of the user.
+            path (List[str]): Keys leading to the value.
+        """
+        with self.lock:
+            node = self.users.get(user_id, None)
+            for key in path[:-1]:
+                if not isinstance(node, dict):
+                    return
+                node = node.get(key, None)
+            if isinstance(node, dict):
+                node.pop(path[-1], None)
+
+    def set_limit(self, user_id: int, topic: str, limit_name: str, value: Any) -> None:
+        """
+        Set a user's limit on a topic.
+
+        Args:
+            user_id (int): The ID of the user.
+            topic (str): The topic.
+            limit_name (str): The name of the limit.
+            value (Any): The limit value, must be convertible to a number.
+        """
+        with self.lock:
+            if user_id in self.users:
+                self.limits.setdefault(user_id, {}).setdefault(topic, {})[limit_name] = Decimal(str(value))
+
+    def get_limits(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Return all limits of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Limit values by topic and limit name.
+        """
+        with self.lock:
+            return {topic: dict(topic_limits) for topic, topic_limits in self.limits.get(user_id, {}).items()}
+
+    def list_limits(self, topics: Optional[List[str]] = None) -> List[Tuple[int, str, str, Any]]:
+        """
+        Return the limits of all users, optionally only on the given topics.
+
+        Args:
+            topics (Optional[List[str]]): Topics to return limits for, all topics if None.
+
+        Returns:
+            List[Tuple[int, str, str, Any]]: User ID, topic, limit name and value of each limit.
+        """
+        topics_set: Optional[Set[str]] = set(topics) if topics is not None else None
+        with self.lock:
+            return [(user_id, topic, limit_name, value)
+                    for user_id, user_limits in self.limits.items()
+                    for topic, topic_limits in user_limits.items()
+                    if topics_set is None or topic in topics_set
+                    for limit_name, value in topic_limits.items()]
+
+    def list_alarms(self) -> List[Tuple[int, str, str, Any]]:
+        """
+        Return the active alarms persisted in the configs of all users.
+
+        Returns:
+            List[Tuple[int, str, str, Any]]: User ID, topic, limit name and last report time of each alarm.
+        """
+        with self.lock:
+            return [(user_id, topic, limit_name, notified_at)
+                    for user_id, user_config in self.users.items()
+                    if isinstance(user_config, dict) and isinstance(user_config.get('alarms'), dict)
+                    for topic, topic_alarms in user_config['alarms'].items()
+                    if isinstance(topic_alarms, dict)
+                    for limit_name, notified_at in topic_alarms.items()]
+
+    def save_alarms(self, alarms: List[Tuple[int, str, str, Optional[int]]]) -> None:
+        """
+        Persist the state of several alarms in the configs of their users at once.
+
+        Args:
+            alarms (List[Tuple[int, str, str, Optional[int]]]): User ID, topic, limit name and last report
+                                                               time of each alarm, None to delete it.
+        """
+        with self.lock:
+            for user_id, topic, limit_name, notified_at in alarms:
+                if user_id not in self.users:
+                    continue
+                if not isinstance(self.users[user_id], dict):
+                    self.users[user_id] = {}
+                config = self.users[user_id]
+                if not isinstance(config.get('alarms'), dict):
+                    config['alarms'] = {}
+                if not isinstance(config['alarms'].get(topic), dict):
+                    config['alarms'][topic] = {}
+                if notified_at is None:
+                    config['alarms'][topic].pop(limit_name, None)
+                else:
+                    config['alarms'][topic][limit_name] = notified_at
+
+    def set_rename(self, user_id: int, topic: str, name: str) -> None:
+        """
+        Set the name a user sees for a topic.
+
+        Args:
+            user_id (int): The ID of the user.
+            topic (str): The topic.
+            name (str): The new name of the topic.
+        """
+        with self.lock:
+            if user_id in self.users:
+                self.renames.setdefault(user_id, {})[topic] = name
+
+    def get_renames(self, user_id: int) -> Dict[str, str]:
+        """
+        Return all renames of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Dict[str, str]: New name by topic.
+        """
+        with self.lock:
+            return dict(self.renames.get(user_id, {}))
@@ -1,12 +1,19 @@
 import logging
 import json
+import time
 import psycopg2
+from contextlib import contextmanager
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 from hashlib import sha256
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from .base import Base
 
+# Legacy limit values that can be cast to NUMERIC and read back as a float
+NUMERIC_PATTERN = '^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]{1,3})?$'
+
 class ConnectionNotEstablishedError(Exception):
     """Exception raised when the database connection is not established."""
     pass
@@ -14,23 +21,29 @@ class ConnectionNotEstablishedError(Exception):
 class PostgreSQL(Base):
     """
     Derived class for PostgreSQL database interaction.
-    """
-    def __init__(self, connection_params: Dict[str, Any]):
-        """Initialize the PostgreSQL object with connection parameters."""
-        self.connection_params = connection_params
-        self.connection = None
-        self.cursor = None
 
-    def rollback(self) -> None:
+    Every operation checks out a connection from a pool, runs in its own transaction
+    on a fresh cursor and returns the connection. The pool is thread-safe, so
+    up to `max_connections` operations may run at the same time from different threads.
+    """
+    def __init__(self, connection_params: Dict[str, Any], min_connections: int = 1,
+                 max_connections: int = 1, health_check_interval: float = 30.0):
         """
-        Roll back the current database transaction.
-        
-        Raises:
-            ConnectionNotEstablishedError: If the database connection is not established.
+        Initialize the PostgreSQL object with connection parameters.
+
+        Args:
+            connection_params (Dict[str, Any]): Parameters passed to psycopg2.connect.
+            min_connections (int): Number of connections kept open in the pool.
+            max_connections (int): Maximum number of connections in the pool.
+            health_check_interval (float): Idle time in seconds after which a connection
+                                           is checked before being used.
         """
-        if not self.connection:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        self.connection.rollback()
+        self.connection_params = connection_params
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.health_check_interval = health_check_interval
+        self.pool: Optional[ThreadedConnectionPool] = None
+        self.last_used: Dict[int, float] = {}
 
     def connect(self) -> None:
         """
@@ -40,23 +53,89 @@ class PostgreSQL(Base):
             Exception: If there is an error while connecting to the database.
         """
         try:
-            self.connection = psycopg2.connect(**self.connection_params)
+            self.pool = ThreadedConnectionPool(self.min_connections, self.max_connections, **self.connection_params)
         except Exception as e:
             logging.error(f'Error connecting to the database: {e}')
             return
-        if not self.connection:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        self.cursor = self.connection.cursor()
         logging.info('Connected to the PostgreSQL database')
 
     def close(self) -> None:
-        """Close the connection to the database."""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
+        """Close all connections to the database."""
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+            self.last_used = {}
             logging.info('Connection to the PostgreSQL database closed')
 
+    def _is_alive(self, connection) -> bool:
+        """Check a connection that has been idle for longer than the health check interval."""
+        if connection.closed:
+            return False
+        if time.monotonic() - self.last_used.get(id(connection), 0.0) < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1;')
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _getconn(self):
+        """
+        Check out a healthy connection from the pool, reconnecting if needed.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        if not self.pool:
+            self.connect()
+        if not self.pool:
+            raise ConnectionNotEstablishedError('Database connection has not been established.')
+        # Every pooled connection may be broken after a database restart
+        for _ in range(self.max_connections + 1):
+            connection = self.pool.getconn()
+            if self._is_alive(connection):
+                return connection
+            logging.warning('Discarding broken database connection')
+            self.last_used.pop(id(connection), None)
+            self.pool.putconn(connection, close=True)
+        raise ConnectionNotEstablishedError('Database connection has not been established.')
+
+    @contextmanager
+    def _cursor(self) -> Iterator[Any]:
+        """
+        Run an operation in its own transaction on a pooled connection.
+
+        The transaction is committed if the block succeeds and rolled back otherwise,
+        connections broken by the error are closed and replaced on the next checkout.
+
+        Yields:
+            cursor: A fresh cursor of the checked out connection.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        connection = self._getconn()
+        try:
+            with connection.cursor() as cursor:
+                yield cursor
+            connection.commit()
+        except Exception:
+            if not connection.closed:
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    pass
+            raise
+        finally:
+            if connection.closed:
+                self.last_used.pop(id(connection), None)
+            else:
+                self.last_used[id(connection)] = time.monotonic()
+            if self.pool:
+                self.pool.putconn(connection, close=bool(connection.closed))
+
     def create_table(self) -> None:
         """
         Create new table(s) in the database.
@@ -64,33 +143,110 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.connection or not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        query = """
-            CREATE TABLE IF NOT EXISTS groups (
-                id SERIAL PRIMARY KEY,
-                group_name VARCHAR(255) UNIQUE,
-                password VARCHAR(64)
-            );
-
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                user_id BIGINT UNIQUE,
-                config JSON
-            );
-
-            CREATE TABLE IF NOT EXISTS user_groups (
-                user_id BIGINT,
-                group_name VARCHAR(255),
-                PRIMARY KEY (user_id, group_name),
-                FOREIGN KEY (user_id) REFERENCES users(user_id),
-                FOREIGN KEY (group_name) REFERENCES groups(group_name)
-            );
-        """
-        self.cursor.execute(query)
-        self.connection.commit()
+        with self._cursor() as cursor:
+            query = """
+                CREATE TABLE IF NOT EXISTS groups (
+                    id SERIAL PRIMARY KEY,
+                    group_name VARCHAR(255) UNIQUE,
+                    password VARCHAR(64)
+                );
+
+                CREATE TABLE IF NOT EXISTS users (
+                    id SERIAL PRIMARY KEY,
+                    user_id BIGINT UNIQUE,
+                    config JSONB
+                );
+
+                CREATE TABLE IF NOT EXISTS user_groups (
+                    user_id BIGINT,
+                    group_name VARCHAR(255),
+                    PRIMARY KEY (user_id, group_name),
+                    FOREIGN KEY (user_id) REFERENCES users(user_id),
+                    FOREIGN KEY (group_name) REFERENCES groups(group_name)
+                );
+
+                CREATE TABLE IF NOT EXISTS limits (
+                    user_id BIGINT,
+                    topic VARCHAR(255),
+                    limit_name VARCHAR(32),
+                    value NUMERIC,
+                    PRIMARY KEY (user_id, topic, limit_name),
+                    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+                );
+
+                CREATE INDEX IF NOT EXISTS limits_topic_idx ON limits (topic);
+
+                CREATE TABLE IF NOT EXISTS renames (
+                    user_id BIGINT,
+                    topic VARCHAR(255),
+                    name TEXT,
+                    PRIMARY KEY (user_id, topic),
+                    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+                );
+            """
+            cursor.execute(query)
+            self.migrate_config(cursor)
         logging.info('Tables created successfully')
 
+    def migrate_config(self, cursor) -> None:
+        """
+        Convert the users' configs to JSONB and move the limits and renames left in them
+        to their own tables.
+
+        Migrated keys are removed from the configs, so the migration only runs once.
+        Limit values that are not plain numbers are logged and dropped instead of
+        aborting the migration.
+
+        Args:
+            cursor: Cursor of the transaction the migration runs in.
+        """
+        cursor.execute("""
+            DO $$
+            BEGIN
+                IF (SELECT data_type FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'config') = 'json' THEN
+                    ALTER TABLE users ALTER COLUMN config TYPE JSONB USING config::JSONB;
+                END IF;
+            END
+            $$;
+        """)
+        config_limits = """
+            FROM users,
+                 jsonb_each(CASE WHEN jsonb_typeof(users.config -> 'limits') = 'object'
+                                 THEN users.config -> 'limits' ELSE '{}' END) AS topic_limits,
+                 jsonb_each(CASE WHEN jsonb_typeof(topic_limits.value) = 'object'
+                                 THEN topic_limits.value ELSE '{}' END) AS topic_limit
+        """
+        query = """
+            SELECT users.user_id, topic_limits.key, topic_limit.key, topic_limit.value::TEXT
+        """ + config_limits + """
+            WHERE NOT COALESCE(btrim(topic_limit.value #>> '{}') ~ %(pattern)s, FALSE);
+        """
+        cursor.execute(query, {'pattern': NUMERIC_PATTERN})
+        for user_id, topic, limit_name, value in cursor.fetchall():
+            logging.warning(f'Limit {limit_name} of user {user_id} for topic {topic} is not a number, '
+                            f'skipped by the migration: {value}')
+        query = """
+            INSERT INTO limits (user_id, topic, limit_name, value)
+            SELECT users.user_id, topic_limits.key, topic_limit.key, btrim(topic_limit.value #>> '{}')::NUMERIC
+        """ + config_limits + """
+            WHERE btrim(topic_limit.value #>> '{}') ~ %(pattern)s
+            ON CONFLICT DO NOTHING;
+
+            INSERT INTO renames (user_id, topic, name)
+            SELECT users.user_id, topic_rename.key, topic_rename.value #>> '{}'
+            FROM users,
+                 jsonb_each(CASE WHEN jsonb_typeof(users.config -> 'renames') = 'object'
+                                 THEN users.config -> 'renames' ELSE '{}' END) AS topic_rename
+            ON CONFLICT DO NOTHING;
+
+            UPDATE users SET config = config - 'limits' - 'renames'
+            WHERE config ? 'limits' OR config ? 'renames';
+        """
+        cursor.execute(query, {'pattern': NUMERIC_PATTERN})
+        if cursor.rowcount > 0:
+            logging.info(f'Limits and renames of {cursor.rowcount} user(s) migrated from config')
+
     def add_group(self, group_name: str, password: str) -> None:
         """
         Add a new group to the table.
@@ -102,15 +258,35 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.connection or not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        hashed_password = sha256(password.encode()).hexdigest()
-        query = sql.SQL("INSERT INTO groups (group_name, password) VALUES ({}, {});").format(
-            sql.Literal(group_name),
-            sql.Literal(hashed_password)
-        )
-        self.cursor.execute(query)
-        self.connection.commit()
+        with self._cursor() as cursor:
+            hashed_password = sha256(password.encode()).hexdigest()
+            query = sql.SQL("INSERT INTO groups (group_name, password) VALUES ({}, {});").format(
+                sql.Literal(group_name),
+                sql.Literal(hashed_password)
+            )
+            cursor.execute(query)
+
+    def add_groups(self, groups: Dict[str, str]) -> List[str]:
+        """
+        Add several groups in one transaction, skipping the ones that already exist.
+
+        Args:
+            groups (Dict[str, str]): Password by group name.
+
+        Returns:
+            List[str]: Names of the groups that were added.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        if not groups:
+            return []
+        rows = [(group_name, sha256(password.encode()).hexdigest()) for group_name, password in groups.items()]
+        query = """INSERT INTO groups (group_name, password) VALUES %s
+                   ON CONFLICT (group_name) DO NOTHING RETURNING group_name;"""
+        with self._cursor() as cursor:
+            result = execute_values(cursor, query, rows, page_size=1000, fetch=True)
+            return [row[0] for row in result]
 
     def add_user(self, user_id: int, password: str) -> str:
         """
@@ -126,55 +302,52 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.connection or not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        hashed_password = sha256(password.encode()).hexdigest()
+        with self._cursor() as cursor:
+            hashed_password = sha256(password.encode()).hexdigest()
 
-        # Check if the password exists in the groups table
-        query = sql.SQL("SELECT group_name FROM groups WHERE password = {};").format(
-            sql.Literal(hashed_password)
-        )
-        self.cursor.execute(query)
-        matching_groups = [result[0] for result in self.cursor.fetchall()]
-
-        if matching_groups: 
-            for matching_group in matching_groups:
-                # Check if the user already exists in the users table
-                query = sql.SQL("SELECT user_id FROM users WHERE user_id = {};").format(
-                    sql.Literal(user_id)
-                )
-                self.cursor.execute(query)
-                existing_user = self.cursor.fetchone()
-
-                if existing_user:
-                    # If user exists, add the group to the user's list
-                    query = sql.SQL("INSERT INTO user_groups (user_id, group_name) VALUES ({}, {});").format(
-                        sql.Literal(user_id),
-                        sql.Literal(matching_group)
-                    )
-                    self.cursor.execute(query)
-                    self.connection.commit()
-                    result_message = f"User added to group '{matching_group}'"
-                    logging.info(result_message)
-                    return result_message
-                else:
-                    # If user does not exist, create a new user and add the group
-                    query = sql.SQL("INSERT INTO users (user_id, config) VALUES ({}, NULL);").format(
+            # Check if the password exists in the groups table
+            query = sql.SQL("SELECT group_name FROM groups WHERE password = {};").format(
+                sql.Literal(hashed_password)
+            )
+            cursor.execute(query)
+            matching_groups = [result[0] for result in cursor.fetchall()]
+
+            if matching_groups: 
+                for matching_group in matching_groups:
+                    # Check if the user already exists in the users table
+                    query = sql.SQL("SELECT user_id FROM users WHERE user_id = {};").format(
                         sql.Literal(user_id)
                     )
-                    self.cursor.execute(query)
-                    query = sql.SQL("INSERT INTO user_groups (user_id, group_name) VALUES ({}, {});").format(
-                        sql.Literal(user_id),
-                        sql.Literal(matching_group)
-                    )
-                    self.cursor.execute(query)
-                    self.connection.commit()
-                    result_message = f"User created and added to group '{matching_group}'"
-                    logging.info(result_message)
-                    return result_message
-        result_message = 'No matching group found for the provided password' 
-        logging.info(result_message)
-        return result_message
+                    cursor.execute(query)
+                    existing_user = cursor.fetchone()
+
+                    if existing_user:
+                        # If user exists, add the group to the user's list
+                        query = sql.SQL("INSERT INTO user_groups (user_id, group_name) VALUES ({}, {});").format(
+                            sql.Literal(user_id),
+                            sql.Literal(matching_group)
+                        )
+                        cursor.execute(query)
+                        result_message = f"User added to group '{matching_group}'"
+                        logging.info(result_message)
+                        return result_message
+                    else:
+                        # If user does not exist, create a new user and add the group
+                        query = sql.SQL("INSERT INTO users (user_id, config) VALUES ({}, NULL);").format(
+                            sql.Literal(user_id)
+                        )
+                        cursor.execute(query)
+                        query = sql.SQL("INSERT INTO user_groups (user_id, group_name) VALUES ({}, {});").format(
+                            sql.Literal(user_id),
+                            sql.Literal(matching_group)
+                        )
+                        cursor.execute(query)
+                        result_message = f"User created and added to group '{matching_group}'"
+                        logging.info(result_message)
+                        return result_message
+            result_message = 'No matching group found for the provided password' 
+            logging.info(result_message)
+            return result_message
 
     def delete_group(self, group_name: str) -> None:
         """
@@ -186,21 +359,18 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.connection or not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        # Delete entries from user_groups table first
-        query_user_groups = sql.SQL("DELETE FROM user_groups WHERE group_name = {};").format(
-            sql.Literal(group_name)
-        )
-        self.cursor.execute(query_user_groups)
-        self.connection.commit()
+        with self._cursor() as cursor:
+            # Delete entries from user_groups table first
+            query_user_groups = sql.SQL("DELETE FROM user_groups WHERE group_name = {};").format(
+                sql.Literal(group_name)
+            )
+            cursor.execute(query_user_groups)
 
-        # Now delete the group from the groups table
-        query_groups = sql.SQL("DELETE FROM groups WHERE group_name = {};").format(
-            sql.Literal(group_name)
-        )
-        self.cursor.execute(query_groups)
-        self.connection.commit()
+            # Now delete the group from the groups table
+            query_groups = sql.SQL("DELETE FROM groups WHERE group_name = {};").format(
+                sql.Literal(group_name)
+            )
+            cursor.execute(query_groups)
 
     def delete_user(self, user_id: int, group_name: str) -> None:
         """
@@ -213,23 +383,20 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.connection or not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        # Delete entry from user_groups table first
-        query_user_groups = sql.SQL("DELETE FROM user_groups WHERE user_id = {} AND group_name = {};").format(
-            sql.Literal(user_id),
-            sql.Literal(group_name)
-        )
-        self.cursor.execute(query_user_groups)
-        self.connection.commit()
+        with self._cursor() as cursor:
+            # Delete entry from user_groups table first
+            query_user_groups = sql.SQL("DELETE FROM user_groups WHERE user_id = {} AND group_name = {};").format(
+                sql.Literal(user_id),
+                sql.Literal(group_name)
+            )
+            cursor.execute(query_user_groups)
 
-        # Now, delete the user from the users table if no more groups are associated
-        query_users = sql.SQL("DELETE FROM users WHERE user_id = {} AND NOT EXISTS (SELECT 1 FROM user_groups WHERE user_id = {});").format(
-            sql.Literal(user_id),
-            sql.Literal(user_id)
-        )
-        self.cursor.execute(query_users)
-        self.connection.commit()
+            # Now, delete the user from the users table if no more groups are associated
+            query_users = sql.SQL("DELETE FROM users WHERE user_id = {} AND NOT EXISTS (SELECT 1 FROM user_groups WHERE user_id = {});").format(
+                sql.Literal(user_id),
+                sql.Literal(user_id)
+            )
+            cursor.execute(query_users)
 
     def get_user(self, group_name: str) -> Optional[List[int]]:
         """
@@ -244,13 +411,12 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        query = sql.SQL("SELECT user_id FROM user_groups WHERE group_name = {};").format(
-            sql.Literal(group_name)
-        )
-        self.cursor.execute(query)
-        return [result[0] for result in self.cursor.fetchall()]
+        with self._cursor() as cursor:
+            query = sql.SQL("SELECT user_id FROM user_groups WHERE group_name = {};").format(
+                sql.Literal(group_name)
+            )
+            cursor.execute(query)
+            return [result[0] for result in cursor.fetchall()]
 
     def get_group(self, user_id: int) -> List[str]:
         """
@@ -265,14 +431,13 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        query = sql.SQL("SELECT group_name FROM user_groups WHERE user_id = {};").format(
-            sql.Literal(user_id)
-        )
-        self.cursor.execute(query)
-        return [result[0] for result in self.cursor.fetchall()]
-    
+        with self._cursor() as cursor:
+            query = sql.SQL("SELECT group_name FROM user_groups WHERE user_id = {};").format(
+                sql.Literal(user_id)
+            )
+            cursor.execute(query)
+            return [result[0] for result in cursor.fetchall()]
+
     def list_groups(self) -> List[str]:
         """
         Return a list of all groups.
@@ -283,11 +448,10 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        query = sql.SQL("SELECT DISTINCT group_name FROM groups;")
-        self.cursor.execute(query)
-        return [result[0] for result in self.cursor.fetchall()]
+        with self._cursor() as cursor:
+            query = sql.SQL("SELECT DISTINCT group_name FROM groups;")
+            cursor.execute(query)
+            return [result[0] for result in cursor.fetchall()]
 
     def list_users(self) -> List[int]:
         """
@@ -299,12 +463,11 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        query = sql.SQL("SELECT DISTINCT user_id FROM users;") 
-        self.cursor.execute(query)
-        return [result[0] for result in self.cursor.fetchall()]
-    
+        with self._cursor() as cursor:
+            query = sql.SQL("SELECT DISTINCT user_id FROM users;") 
+            cursor.execute(query)
+            return [result[0] for result in cursor.fetchall()]
+
     def set_config(self, user_id: int, config: Dict) -> None:
         """
         Set a user's configuration by user ID.
@@ -316,15 +479,13 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.connection or not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        json_config = json.dumps(config)
-        query = sql.SQL("UPDATE users SET config = {} WHERE user_id = {};").format(
-            sql.Literal(json_config),
-            sql.Literal(user_id)
-        )
-        self.cursor.execute(query)
-        self.connection.commit()
+        with self._cursor() as cursor:
+            json_config = json.dumps(config)
+            query = sql.SQL("UPDATE users SET config = {} WHERE user_id = {};").format(
+                sql.Literal(json_config),
+                sql.Literal(user_id)
+            )
+            cursor.execute(query)
 
     def get_config(self, user_id: int) -> Optional[Dict]:
         """
@@ -339,21 +500,242 @@ class PostgreSQL(Base):
         Raises:
             ConnectionNotEstablishedError: If the database connection is not established.
         """
-        if not self.cursor:
-            raise ConnectionNotEstablishedError('Database connection has not been established.')
-        query = sql.SQL("SELECT config FROM users WHERE user_id = {};").format(
-            sql.Literal(user_id)
-        )
-        self.cursor.execute(query)
-        result = self.cursor.fetchone()
+        with self._cursor() as cursor:
+            query = sql.SQL("SELECT config FROM users WHERE user_id = {};").format(
+                sql.Literal(user_id)
+            )
+            cursor.execute(query)
+            result = cursor.fetchone()
 
-        if result:
-            config = result[0]
-            if config is not None:
-                return config
+            if result:
+                config = result[0]
+                if config is not None:
+                    return config
+                else:
+                    logging.info(f'Config for user {user_id} is NULL')
+                    return None
             else:
-                logging.info(f'Config for user {user_id} is NULL')
+                logging.error(f'No config found for user {user_id}')
                 return None
+
+    def set_config_value(self, user_id: int, path: List[str], value: Any) -> None:
+        """
+        Set a single value in a user's configuration, creating missing parent objects.
+
+        Args:
+            user_id (int): The ID of the user.
+            path (List[str]): Keys leading to the value.
+            value (Any): The value, must be JSON serializable.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        # jsonb_set only creates the last key, so every parent object is set first
+        config = sql.SQL("COALESCE(config, '{}'::JSONB)")
+        for i in range(1, len(path)):
+            config = sql.SQL("jsonb_set({}, {}, COALESCE(config #> {}, '{{}}'::JSONB))").format(
+                config,
+                sql.Literal(path[:i]),
+                sql.Literal(path[:i])
+            )
+        query = sql.SQL("UPDATE users SET config = jsonb_set({}, {}, {}::JSONB) WHERE user_id = {};").format(
+            config,
+            sql.Literal(list(path)),
+            sql.Literal(json.dumps(value)),
+            sql.Literal(user_id)
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+
+    def delete_config_value(self, user_id: int, path: List[str]) -> None:
+        """
+        Delete a single value from a user's configuration.
+
+        Args:
+            user_id (int): The ID of the user.
+            path (List[str]): Keys leading to the value.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        query = sql.SQL("UPDATE users SET config = config #- {} WHERE user_id = {};").format(
+            sql.Literal(list(path)),
+            sql.Literal(user_id)
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+
+    def set_limit(self, user_id: int, topic: str, limit_name: str, value: Any) -> None:
+        """
+        Set a user's limit on a topic.
+
+        Args:
+            user_id (int): The ID of the user.
+            topic (str): The topic.
+            limit_name (str): The name of the limit.
+            value (Any): The limit value, must be convertible to a number.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        query = sql.SQL("""INSERT INTO limits (user_id, topic, limit_name, value) VALUES ({}, {}, {}, {})
+                           ON CONFLICT (user_id, topic, limit_name) DO UPDATE SET value = EXCLUDED.value;""").format(
+            sql.Literal(user_id),
+            sql.Literal(topic),
+            sql.Literal(limit_name),
+            sql.Literal(str(value))
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+
+    def get_limits(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Return all limits of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Limit values by topic and limit name.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        query = sql.SQL("SELECT topic, limit_name, value FROM limits WHERE user_id = {};").format(
+            sql.Literal(user_id)
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+            limits: Dict[str, Dict[str, Any]] = {}
+            for topic, limit_name, value in cursor.fetchall():
+                limits.setdefault(topic, {})[limit_name] = value
+            return limits
+
+    def list_limits(self, topics: Optional[List[str]] = None) -> List[Tuple[int, str, str, Any]]:
+        """
+        Return the limits of all users, optionally only on the given topics.
+
+        Args:
+            topics (Optional[List[str]]): Topics to return limits for, all topics if None.
+
+        Returns:
+            List[Tuple[int, str, str, Any]]: User ID, topic, limit name and value of each limit.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        if topics is None:
+            query = sql.SQL("SELECT user_id, topic, limit_name, value FROM limits;")
         else:
-            logging.error(f'No config found for user {user_id}')
-            return None
\ No newline at end of file
+            query = sql.SQL("SELECT user_id, topic, limit_name, value FROM limits WHERE topic = ANY({});").format(
+                sql.Literal(list(topics))
+            )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+            return cursor.fetchall()
+
+    def list_alarms(self) -> List[Tuple[int, str, str, Any]]:
+        """
+        Return the active alarms persisted in the configs of all users.
+
+        Returns:
+            List[Tuple[int, str, str, Any]]: User ID, topic, limit name and last report time of each alarm.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        query = sql.SQL("""
+            SELECT users.user_id, topic_alarms.key, topic_alarm.key, topic_alarm.value #>> '{}'
+            FROM users,
+                 jsonb_each(CASE WHEN jsonb_typeof(users.config -> 'alarms') = 'object'
+                                 THEN users.config -> 'alarms' ELSE '{}' END) AS topic_alarms,
+                 jsonb_each(CASE WHEN jsonb_typeof(topic_alarms.value) = 'object'
+                                 THEN topic_alarms.value ELSE '{}' END) AS topic_alarm;
+        """)
+        with self._cursor() as cursor:
+            cursor.execute(query)
+            return cursor.fetchall()
+
+    def save_alarms(self, alarms: List[Tuple[int, str, str, Optional[int]]]) -> None:
+        """
+        Persist the state of several alarms in the configs of their users in one statement.
+
+        Args:
+            alarms (List[Tuple[int, str, str, Optional[int]]]): User ID, topic, limit name and last report
+                                                               time of each alarm, None to delete it.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        if not alarms:
+            return
+        # The alarms of each topic are merged into the stored ones, then the topics of each user
+        query = """
+            UPDATE users SET config = jsonb_set(CASE WHEN jsonb_typeof(users.config) = 'object'
+                                                     THEN users.config ELSE '{}' END, '{alarms}',
+                                                CASE WHEN jsonb_typeof(users.config -> 'alarms') = 'object'
+                                                     THEN users.config -> 'alarms' ELSE '{}' END || changed.alarms)
+            FROM (
+                SELECT topic_alarms.user_id, jsonb_object_agg(topic_alarms.topic, topic_alarms.alarms) AS alarms
+                FROM (
+                    SELECT changes.user_id, changes.topic,
+                           (CASE WHEN jsonb_typeof(stored.config -> 'alarms' -> changes.topic) = 'object'
+                                 THEN stored.config -> 'alarms' -> changes.topic ELSE '{}' END
+                            - COALESCE(array_agg(changes.limit_name) FILTER (WHERE changes.notified_at IS NULL),
+                                       '{}'::TEXT[]))
+                           || COALESCE(jsonb_object_agg(changes.limit_name, changes.notified_at)
+                                       FILTER (WHERE changes.notified_at IS NOT NULL), '{}') AS alarms
+                    FROM (VALUES %s) AS changes (user_id, topic, limit_name, notified_at)
+                    JOIN users AS stored ON stored.user_id = changes.user_id
+                    GROUP BY changes.user_id, changes.topic, stored.config
+                ) AS topic_alarms
+                GROUP BY topic_alarms.user_id
+            ) AS changed
+            WHERE users.user_id = changed.user_id;
+        """
+        rows = [(user_id, topic, limit_name, None if notified_at is None else json.dumps(notified_at))
+                for user_id, topic, limit_name, notified_at in alarms]
+        with self._cursor() as cursor:
+            execute_values(cursor, query, rows, template='(%s::BIGINT, %s::TEXT, %s::TEXT, %s::JSONB)',
+                           page_size=len(rows))
+
+    def set_rename(self, user_id: int, topic: str, name: str) -> None:
+        """
+        Set the name a user sees for a topic.
+
+        Args:
+            user_id (int): The ID of the user.
+            topic (str): The topic.
+            name (str): The new name of the topic.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        query = sql.SQL("""INSERT INTO renames (user_id, topic, name) VALUES ({}, {}, {})
+                           ON CONFLICT (user_id, topic) DO UPDATE SET name = EXCLUDED.name;""").format(
+            sql.Literal(user_id),
+            sql.Literal(topic),
+            sql.Literal(name)
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+
+    def get_renames(self, user_id: int) -> Dict[str, str]:
+        """
+        Return all renames of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Dict[str, str]: New name by topic.
+
+        Raises:
+            ConnectionNotEstablishedError: If the database connection is not established.
+        """
+        query = sql.SQL("SELECT topic, name FROM renames WHERE user_id = {};").format(
+            sql.Literal(user_id)
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query)
+            return dict(cursor.fetchall())
@@ -1,4 +1,5 @@
 from .common import dp
 from .mqtt import dp, router
+from .admin import dp
 
 __all__ = ['dp', 'router']
\ No newline at end of file
@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import math
+
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BotCommand, Message
+
+from botmq.data import config
+from botmq.loader import dp, profiler
+from botmq.utility.commands import register_command
+from botmq.utility.format import split_message
+
+async def send_profile(message: Message) -> None:
+    _, lines = profiler.stop()
+    logging.info(lines[0])
+    for text in split_message(lines):
+        await message.answer(text)
+
+@register_command(BotCommand(command='/profile', description='Profile the bot (admins only)'))
+@dp.message(Command('profile'))
+async def cmd_profile(message: Message, command: CommandObject) -> None:
+    logging.info('/profile')
+    if not message.from_user or str(message.from_user.id) not in config.ADMIN_IDS:
+        await message.answer('Only admins can profile the bot')
+        return
+    if command.args is None:
+        # Toggle
+        if profiler.running:
+            await send_profile(message)
+        else:
+            profiler.start()
+            await message.answer('Profiling started, send /profile again to stop')
+        return
+    try:
+        duration = float(command.args)
+    except ValueError:
+        duration = math.nan
+    if not math.isfinite(duration) or duration <= 0:
+        await message.answer('Usage: /profile [seconds], seconds must be a positive number')
+        return
+    profiler.start()
+    started = profiler.started
+    await message.answer(f'Profiling for {duration:g}s')
+    await asyncio.sleep(duration)
+    # Unless stopped or restarted meanwhile
+    if profiler.running and profiler.started == started:
+        await send_profile(message)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from aiogram import F
@@ -8,13 +9,11 @@ from aiogram.filters import Filter, CommandObject
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.fsm.context import FSMContext
 
-from converter.requests import get_value_async
-
-from botmq.data.config import SERVER_ADDRESS, SERVER_PORT
 from botmq.polling import LIMIT_NAMES
-from botmq.loader import dp, router, data_base
-from botmq.utility.format import format_to_title_case
-from botmq.utility.db import set_limit, list_limits, set_rename, list_renames, get_topic_name
+from botmq.loader import dp, router, data_base, converter_client
+from botmq.data import config
+from botmq.utility.format import format_to_title_case, split_message
+from botmq.utility.db import set_limit, list_limits, set_rename, list_renames, get_topic_name, get_topic_names
 from botmq.utility.commands import register_command
 
 class FloatFilter(Filter):
@@ -60,9 +59,8 @@ async def cmd_password(message: Message, command: CommandObject) -> None:
                 )
         return
     try:
-        result_message = data_base.add_user(message.from_user.id, password)
+        result_message = await data_base.add_user(message.from_user.id, password)
     except Exception as e:
-        data_base.rollback() 
         result_message = f'{e}'
     await message.answer(f'{result_message}')
 
@@ -75,17 +73,22 @@ async def cmd_report(message: Message) -> None:
         logging.error(result_message)
         await message.answer(result_message)
         return
-    result_message = ''
-    user_groups = data_base.get_group(message.from_user.id)
+    user_groups = await data_base.get_group(message.from_user.id)
     if not user_groups:
         await message.answer("You don't have topics")
         return
     logging.info(f'User {message.from_user.id} groups: {user_groups}')
+    values, topic_names = await asyncio.gather(
+        converter_client.get_values(user_groups, batch_size=config.REPORT_BATCH_SIZE),
+        get_topic_names(message.from_user.id, user_groups))
+    lines = []
     for topic in user_groups:
-        value = await get_value_async(SERVER_ADDRESS, SERVER_PORT, topic)
-        value = str(value).strip()
-        result_message += f'{get_topic_name(message.from_user.id, topic)}: {value}\n' 
-    await message.answer(f'{result_message}')
+        value = values.get(topic, None)
+        if value is None:
+            value = f'Topic "{topic}" not found'
+        lines.append(f'{topic_names[topic]}: {str(value).strip()}')
+    for result_message in split_message(lines):
+        await message.answer(result_message)
     logging.info('Message sent')
 
 @register_command(BotCommand(command='/check', description='Check value of the topic'))
@@ -97,15 +100,16 @@ async def cmd_check(message: Message) -> None:
         logging.error(result_message)
         await message.answer(result_message)
         return
-    user_groups = data_base.get_group(message.from_user.id)
+    user_groups = await data_base.get_group(message.from_user.id)
     if not user_groups:
         await message.answer("You don't have topics")
         return
     logging.info(f'User {message.from_user.id} groups: {user_groups}')
+    topic_names = await get_topic_names(message.from_user.id, user_groups)
     keyboard = InlineKeyboardBuilder()
     for topic in user_groups:
         keyboard.row(InlineKeyboardButton(
-            text=get_topic_name(message.from_user.id, topic),
+            text=topic_names[topic],
             callback_data=f'check-topic_{topic}'),
             width=1
         )
@@ -128,8 +132,8 @@ async def get_topic_value(callback: CallbackQuery) -> None:
         await callback.answer(result_message)
         return
     topic = callback.data.split('_', 1)[1]
-    value = await get_value_async(SERVER_ADDRESS, SERVER_PORT, topic)
-    await callback.message.edit_text(f'Value of {get_topic_name(callback.from_user.id, topic)} topic: {value}')
+    value = await converter_client.get_value(topic)
+    await callback.message.edit_text(f'Value of {await get_topic_name(callback.from_user.id, topic)} topic: {value}')
     await callback.answer()
 
 @register_command(BotCommand(command='/list_limits', description='Show your limits'))
@@ -141,13 +145,13 @@ async def cmd_list_limits(message: Message) -> None:
         logging.error(result_message)
         await message.answer(result_message)
         return
-    limits = list_limits(message.from_user.id)
+    limits = await list_limits(message.from_user.id)
     if limits is None:
         await message.answer("You don't have limits")
         return
     result_message = ''
     for topic in limits:
-        result_message += f'{get_topic_name(message.from_user.id, topic)}\n'
+        result_message += f'{await get_topic_name(message.from_user.id, topic)}\n'
         for limit in limits[topic]:
             result_message += f'\t{format_to_title_case(limit)}: {limits[topic][limit]}\n'
     await message.answer(result_message)
@@ -162,7 +166,7 @@ async def set_limits_cmd_limit(message: Message, state: FSMContext) -> None:
         logging.error(result_message)
         await message.answer(result_message)
         return
-    user_groups = data_base.get_group(message.from_user.id)
+    user_groups = await data_base.get_group(message.from_user.id)
     logging.info(f'User {message.from_user.id} groups: {user_groups}')
     if not user_groups:
         await message.answer("You don't have topics")
@@ -170,7 +174,7 @@ async def set_limits_cmd_limit(message: Message, state: FSMContext) -> None:
     keyboard = InlineKeyboardBuilder()
     for topic in user_groups:
         keyboard.row(InlineKeyboardButton(
-            text=get_topic_name(message.from_user.id, topic),
+            text=await get_topic_name(message.from_user.id, topic),
             callback_data=f'limit-topic_{topic}'),
             width=1
         )
@@ -227,7 +231,7 @@ async def set_limits_choosing_limit(callback: CallbackQuery, state: FSMContext)
     user_data = await state.get_data()
     topic = user_data['SetLimits_chosen_topic']
     await callback.message.edit_text(
-        text=f'Set a value of {format_to_title_case(limit_type)} for the {get_topic_name(callback.from_user.id, topic)} topic:', 
+        text=f'Set a value of {format_to_title_case(limit_type)} for the {await get_topic_name(callback.from_user.id, topic)} topic:', 
     )
     await state.set_state(SetLimits.choosing_value)
     logging.info('Message sent')
@@ -242,7 +246,7 @@ async def set_limits_choosing_value(message: Message, state: FSMContext) -> None
     user_data = await state.get_data()
     topic = user_data['SetLimits_chosen_topic']
     limit = user_data['SetLimits_chosen_limit']
-    set_limit(message.from_user.id, topic, limit, message.text)
+    await set_limit(message.from_user.id, topic, limit, message.text)
     await message.answer('Limit set')
     await state.clear()
     logging.info('Message sent')
@@ -256,7 +260,7 @@ async def cmd_list_renames(message: Message) -> None:
         logging.error(result_message)
         await message.answer(result_message)
         return
-    renames = list_renames(message.from_user.id)
+    renames = await list_renames(message.from_user.id)
     if renames is None:
         await message.answer("You don't have renames")
         return
@@ -275,7 +279,7 @@ async def set_renames_cmd_rename(message: Message, state: FSMContext) -> None:
         logging.error(result_message)
         await message.answer(result_message)
         return
-    user_groups = data_base.get_group(message.from_user.id)
+    user_groups = await data_base.get_group(message.from_user.id)
     logging.info(f'User {message.from_user.id} groups: {user_groups}')
     if not user_groups:
         await message.answer("You don't have topics")
@@ -283,7 +287,7 @@ async def set_renames_cmd_rename(message: Message, state: FSMContext) -> None:
     keyboard = InlineKeyboardBuilder()
     for topic in user_groups:
         keyboard.row(InlineKeyboardButton(
-            text=get_topic_name(message.from_user.id, topic),
+            text=await get_topic_name(message.from_user.id, topic),
             callback_data=f'rename-topic_{topic}',
             width=1)
         )
@@ -309,7 +313,7 @@ async def set_renames_choosing_topic(callback: CallbackQuery, state: FSMContext)
     topic = callback.data.split('_', 1)[1]
     await state.update_data(SetRenames_chosen_topic=topic)
     await callback.message.edit_text(
-        text=f'Set a name of the {get_topic_name(callback.from_user.id, topic)} topic:', 
+        text=f'Set a name of the {await get_topic_name(callback.from_user.id, topic)} topic:', 
     )
     await state.set_state(SetRenames.choosing_name)
     logging.info('Message sent')
@@ -328,7 +332,7 @@ async def set_renames_choosing_name(message: Message, state: FSMContext) -> None
         return
     user_data = await state.get_data()
     topic = user_data['SetRenames_chosen_topic']
-    set_rename(message.from_user.id, topic, message.text)
+    await set_rename(message.from_user.id, topic, message.text)
     await message.answer('Rename set')
     await state.clear()
     logging.info('Message sent')
\ No newline at end of file
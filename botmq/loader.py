@@ -1,8 +1,18 @@
 from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from converter.requests import ConverterClient
 
 from .data import config
-from .db.context import Context
+from .db.context import AsyncContext
 from .db.postgresql import PostgreSQL
+from .db.memory import Memory
+from .utility.limits import LimitIndex
+from .utility.values import TopicValues
+from .alarms import AlarmTracker
+from .notifier import Notifier
+from .tracing import Profiler, tracer
 
 db_settings = {
     'host': config.POSTGRES_HOST,
@@ -11,9 +21,36 @@ db_settings = {
     'password': config.POSTGRES_PASSWORD,
     'database': config.POSTGRES_DB,
 }
-data_base = Context(PostgreSQL(db_settings))
-data_base.create_table()
+if config.DB_BACKEND == 'memory':
+    data_base = AsyncContext(Memory())
+else:
+    # One worker per pooled connection, so a checkout never finds the pool exhausted
+    data_base = AsyncContext(PostgreSQL(db_settings, config.POSTGRES_POOL_MIN, config.POSTGRES_POOL_MAX),
+                             max_workers=config.POSTGRES_POOL_MAX)
+data_base.handler.create_table()
+limit_index = LimitIndex()
+alarm_tracker = AlarmTracker(config.ALARM_HYSTERESIS, config.ALARM_RENOTIFY_INTERVAL)
+
+if config.TRACE_FILE:
+    tracer.open(config.TRACE_FILE, config.TRACE_FORMAT)
+profiler = Profiler(config.PROFILE_DIR)
+
+converter_client = ConverterClient(config.SERVER_ADDRESS,
+                                   config.SERVER_PORT,
+                                   config.SERVER_POOL_SIZE,
+                                   config.SERVER_REQUEST_TIMEOUT,
+                                   trace_configs=[tracer.trace_config('converter')] if tracer.enabled else None)
+topic_values = TopicValues()
 
-bot = Bot(token=config.BOT_TOKEN)
+if config.TELEGRAM_API_URL:
+    bot = Bot(token=config.BOT_TOKEN,
+              session=AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_URL)))
+else:
+    bot = Bot(token=config.BOT_TOKEN)
+notifier = Notifier(bot,
+                    config.NOTIFIER_WORKERS,
+                    config.TELEGRAM_GLOBAL_RATE,
+                    config.TELEGRAM_CHAT_RATE,
+                    queue_size=config.NOTIFIER_QUEUE_SIZE)
 dp = Dispatcher()
 router = Router()
\ No newline at end of file
@@ -0,0 +1,58 @@
+from typing import Iterator
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+
+CHECK_LIMITS_DURATION = Histogram('botmq_check_limits_stage_duration_seconds',
+                                  'Duration of the limit checks by stage', ['stage'])
+DB_QUERY_DURATION = Histogram('botmq_db_query_duration_seconds',
+                              'Duration of database operations by method', ['method'])
+DB_ERRORS = Counter('botmq_db_errors_total', 'Failed database operations by method', ['method'])
+LIMIT_EVALUATIONS = Counter('botmq_limit_evaluations_total', 'Limits compared by the limit checks')
+LIMIT_EVALUATIONS_SKIPPED = Counter('botmq_limit_evaluations_skipped_total',
+                                    'Limits not compared because neither their value nor the limit changed')
+TELEGRAM_SEND_DURATION = Histogram('botmq_telegram_send_duration_seconds',
+                                   'Duration of the messages sent to Telegram')
+TELEGRAM_ERRORS = Counter('botmq_telegram_errors_total',
+                          'Failed attempts to send a message to Telegram by kind', ['kind'])
+HANDLER_DURATION = Histogram('botmq_handler_duration_seconds',
+                             'Duration of the handling of an update by command', ['command'])
+
+class BotCollector:
+    """Exposes the state of the bot singletons when scraped."""
+    def __init__(self, notifier, config_cache, limit_index, alarm_tracker, topic_values):
+        """
+        Initialize the collector.
+
+        Args:
+            notifier (Notifier): Queue of outgoing messages.
+            config_cache (LRUCache): Cache of the user configs.
+            limit_index (LimitIndex): Index of the limits by topic.
+            alarm_tracker (AlarmTracker): State of the alarms.
+            topic_values (TopicValues): Values mirrored from the converter.
+        """
+        self.notifier = notifier
+        self.config_cache = config_cache
+        self.limit_index = limit_index
+        self.alarm_tracker = alarm_tracker
+        self.topic_values = topic_values
+
+    def collect(self) -> Iterator[Metric]:
+        yield GaugeMetricFamily('botmq_notifier_queue_depth', 'Messages waiting to be sent',
+                                value=self.notifier.queue.qsize())
+        yield CounterMetricFamily('botmq_notifier_retries', 'Messages sent again after a failure',
+                                  value=self.notifier.retries)
+        yield CounterMetricFamily('botmq_notifier_dropped', 'Messages dropped because the queue was full',
+                                  value=self.notifier.dropped)
+        yield CounterMetricFamily('botmq_config_cache_hits', 'User config lookups served from memory',
+                                  value=self.config_cache.hits)
+        yield CounterMetricFamily('botmq_config_cache_misses', 'User config lookups loaded from the database',
+                                  value=self.config_cache.misses)
+        yield GaugeMetricFamily('botmq_config_cache_size', 'User configs kept in memory',
+                                value=len(self.config_cache))
+        yield GaugeMetricFamily('botmq_watched_topics', 'Topics with at least one limit',
+                                value=len(self.limit_index.topics))
+        yield GaugeMetricFamily('botmq_active_alarms', 'Limits currently exceeded',
+                                value=len(self.alarm_tracker.alarms))
+        yield GaugeMetricFamily('botmq_mirrored_topics', 'Topics mirrored from the converter',
+                                value=len(self.topic_values))
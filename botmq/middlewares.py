@@ -0,0 +1,59 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Update
+
+from .metrics import HANDLER_DURATION
+from .tracing import tracer
+from .utility.commands import bot_commands
+
+def command_of(update: Update) -> str:
+    # Label of an update, unknown commands are not used as labels to bound their number
+    if update.callback_query is not None:
+        return 'callback_query'
+    if update.message is None:
+        return update.event_type
+    text = update.message.text or ''
+    if text.startswith('/'):
+        command = text.split(maxsplit=1)[0].split('@', 1)[0]
+        if any(bot_command.command == command for bot_command in bot_commands):
+            return command
+        return 'unknown_command'
+    return 'message'
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Outer update middleware recording the handling time of every command."""
+    async def __call__(self,
+                       handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+                       event: Update,
+                       data: Dict[str, Any]) -> Any:
+        start_time = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            HANDLER_DURATION.labels(command_of(event)).observe(time.perf_counter() - start_time)
+
+class TracingMiddleware(BaseMiddleware):
+    """Outer update middleware recording every update as the root span of a trace."""
+    async def __call__(self,
+                       handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+                       event: Update,
+                       data: Dict[str, Any]) -> Any:
+        with tracer.span('update', command=command_of(event), update_id=event.update_id):
+            return await handler(event, data)
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """Bot session middleware recording every Telegram API request as a span."""
+    async def __call__(self,
+                       make_request: NextRequestMiddlewareType[TelegramType],
+                       bot: Bot,
+                       method: TelegramMethod[TelegramType]) -> Response[TelegramType]:
+        # Long polling would add an empty trace every few seconds
+        if method.__api_method__ == 'getUpdates':
+            return await make_request(bot, method)
+        with tracer.span(f'telegram.{method.__api_method__}', chat_id=getattr(method, 'chat_id', None)):
+            return await make_request(bot, method)
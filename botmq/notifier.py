@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter
+
+from .metrics import TELEGRAM_ERRORS, TELEGRAM_SEND_DURATION
+
+ChatId = Union[int, str]
+
+class Notifier:
+    """
+    Queue of outgoing Telegram messages drained by concurrent workers.
+
+    Sends are spaced to respect a global and a per-chat rate limit, and retried
+    after the delay Telegram asks for when it answers with 429 Too Many Requests.
+    Messages queued while the queue is full are dropped and counted.
+    """
+    def __init__(self, bot: Bot, workers: int = 8, global_rate: float = 30.0,
+                 chat_rate: float = 1.0, max_retries: int = 3, queue_size: int = 10000):
+        """
+        Initialize notifier.
+
+        Args:
+            bot (Bot): Bot used to send the messages.
+            workers (int): Number of messages sent at the same time.
+            global_rate (float): Maximum number of messages per second to all chats.
+            chat_rate (float): Maximum number of messages per second to one chat.
+            max_retries (int): Number of times a failed message is sent again.
+            queue_size (int): Maximum number of messages waiting to be sent.
+        """
+        self.bot: Bot = bot
+        self.workers: int = workers
+        self.global_interval: float = 1 / global_rate
+        self.chat_interval: float = 1 / chat_rate
+        self.max_retries: int = max_retries
+        self.queue: asyncio.Queue[Tuple[ChatId, str]] = asyncio.Queue(queue_size)
+        self.tasks: List[asyncio.Task] = []
+        # Earliest time the next message may be sent, globally and per chat
+        self.global_next: float = 0.0
+        self.chat_next: Dict[ChatId, float] = {}
+        self.sent: int = 0
+        self.errors: int = 0
+        self.retries: int = 0
+        self.dropped: int = 0
+        self.latency_total: float = 0.0
+        self.latency_max: float = 0.0
+
+    def send(self, chat_id: ChatId, text: str) -> None:
+        """
+        Queue a message without waiting for it to be sent, drop it if the queue is full.
+
+        Args:
+            chat_id (ChatId): Chat to send the message to.
+            text (str): Text of the message.
+        """
+        try:
+            self.queue.put_nowait((chat_id, text))
+        except asyncio.QueueFull:
+            TELEGRAM_ERRORS.labels('queue_full').inc()
+            self.dropped += 1
+            # Not every drop, a full queue drops many at once
+            if self.dropped % 1000 == 1:
+                logging.warning(f'Notification queue is full, {self.dropped} message(s) dropped so far')
+
+    def start(self) -> None:
+        """Start the workers."""
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Wait for the queued messages to be sent and stop the workers.
+
+        Args:
+            timeout (Optional[float]): How long to wait for the queue to drain in seconds.
+        """
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f'Notifier stopped with {self.queue.qsize()} unsent message(s)')
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Return queue depth and send statistics.
+
+        Returns:
+            Dict[str, Any]: Queue depth, sent, error, retry and drop counters and send latency in ms.
+        """
+        return {
+            'queue_depth': self.queue.qsize(),
+            'sent': self.sent,
+            'errors': self.errors,
+            'retries': self.retries,
+            'dropped': self.dropped,
+            'latency_avg_ms': self.latency_total / self.sent * 1000 if self.sent else 0.0,
+            'latency_max_ms': self.latency_max * 1000,
+        }
+
+    async def _wait_slot(self, chat_id: ChatId) -> None:
+        # Wait for the chat to be free, then for a global slot, and only take both once free:
+        # the times are read again after every sleep, since other workers and a retry_after
+        # may have moved them meanwhile
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            chat_slot = self.chat_next.get(chat_id, 0.0)
+            if chat_slot > now:
+                await asyncio.sleep(chat_slot - now)
+                continue
+            if self.global_next > now:
+                await asyncio.sleep(self.global_next - now)
+                continue
+            break
+        self.global_next = now + self.global_interval
+        self.chat_next[chat_id] = now + self.chat_interval
+        if len(self.chat_next) > 10000:
+            self.chat_next = {x: slot for x, slot in self.chat_next.items() if slot > now}
+
+    async def _deliver(self, chat_id: ChatId, text: str) -> None:
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            await self._wait_slot(chat_id)
+            start_time = loop.time()
+            try:
+                await self.bot.send_message(chat_id, text)
+            except TelegramRetryAfter as e:
+                # Flood control applies to the whole bot, hold every worker back
+                logging.warning(f'Telegram asked to retry after {e.retry_after}s')
+                TELEGRAM_ERRORS.labels('retry_after').inc()
+                self.global_next = max(self.global_next, loop.time() + e.retry_after)
+            except TelegramNetworkError as e:
+                logging.warning(f'Network error sending message to {chat_id}: {e}')
+                TELEGRAM_ERRORS.labels('network').inc()
+                await asyncio.sleep(2 ** attempt)
+            except TelegramAPIError as e:
+                logging.error(f'Error sending message to {chat_id}: {e}')
+                TELEGRAM_ERRORS.labels('api').inc()
+                self.errors += 1
+                return
+            else:
+                duration = loop.time() - start_time
+                self.sent += 1
+                self.latency_total += duration
+                self.latency_max = max(self.latency_max, duration)
+                TELEGRAM_SEND_DURATION.observe(duration)
+                return
+            if attempt < self.max_retries:
+                self.retries += 1
+        logging.error(f'Message to {chat_id} dropped after {self.max_retries} retries')
+        TELEGRAM_ERRORS.labels('dropped').inc()
+        self.errors += 1
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id, text = await self.queue.get()
+            try:
+                await self._deliver(chat_id, text)
+            except Exception as e:
+                logging.error(f'Error sending message to {chat_id}: {e}')
+                self.errors += 1
+            finally:
+                self.queue.task_done()
@@ -1,78 +1,294 @@
 import asyncio
 import logging
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, List, NamedTuple, Optional, Set
 
-from converter.requests import list_topics_async, get_value_async 
+import numpy as np
 
-from .utility.format import format_to_title_case
+from .utility.format import format_to_title_case, split_message
 from .utility.db import get_topic_name
-from .data.config import ADMIN_IDS, SERVER_ADDRESS, SERVER_PORT
-from .loader import data_base, bot
+from .utility.digest import Digest
+from .utility.limits import Subscriber
+from .data.config import ADMIN_IDS, DIGEST_MAX_ALARMS, REGISTER_BATCH_SIZE, REGISTER_DELAY
+from .loader import data_base, converter_client, limit_index, alarm_tracker, notifier, topic_values
+from .alarms import CLEARED
+from .metrics import CHECK_LIMITS_DURATION, LIMIT_EVALUATIONS, LIMIT_EVALUATIONS_SKIPPED
+from .tracing import tracer
 
-async def exceed_limit_default(limit_name: str, limit_value: str, current_value: str, topic: str, user_id) -> None:
+async def exceed_limit_default(limit_name: str, limit_value: str, current_value: str, topic: str, user_id) -> str:
     #TODO Customize each case 
-    loop = asyncio.get_running_loop()
-    start_time = loop.time()
-    
-    result = await bot.send_message(user_id, f'The {get_topic_name(user_id, topic)} topic has exceeded its {format_to_title_case(limit_name)} limit of {limit_value} with a current value of {current_value}.')
-    finish_time = loop.time()
-    duration = (finish_time - start_time) * 1000
+    topic_name = await get_topic_name(user_id, topic)
     logging.info(f'The {topic} topic has exceeded its {limit_name} limit of {limit_value} with a current value of {current_value}.')
-    logging.info('User id: %d. Duration: %dms' % (user_id, duration))
+    return f'The {topic_name} topic has exceeded its {format_to_title_case(limit_name)} limit of {limit_value} with a current value of {current_value}.'
+
+async def clear_limit_default(limit_name: str, limit_value: str, current_value: str, topic: str, user_id) -> str:
+    topic_name = await get_topic_name(user_id, topic)
+    logging.info(f'The {topic} topic is back within its {limit_name} limit of {limit_value} with a current value of {current_value}.')
+    return f'The {topic_name} topic is back within its {format_to_title_case(limit_name)} limit of {limit_value} with a current value of {current_value}.'
+
+class Limit(NamedTuple):
+    # Returns the alarm message
+    callback: Callable[[str, str, str, str, int], Awaitable[str]]
+    # Collect the alarm into the user's digest instead of sending it on its own
+    digest: bool
 
 LIMITS = {
-    'lower_limit': exceed_limit_default,
-    'upper_limit': exceed_limit_default,
-    'lower_panic': exceed_limit_default,
-    'upper_panic': exceed_limit_default,
+    'lower_limit': Limit(exceed_limit_default, digest=True),
+    'upper_limit': Limit(exceed_limit_default, digest=True),
+    'lower_panic': Limit(exceed_limit_default, digest=False),
+    'upper_panic': Limit(exceed_limit_default, digest=False),
 }
 
+DEFAULT_LIMIT = Limit(exceed_limit_default, digest=True)
+
 LIMIT_NAMES = list(LIMITS.keys())
 
+# Shortest time in seconds between two limit checks while the value stream is open
+MIN_CHECK_INTERVAL = 1.0
+# Time in seconds the alarms raised by the value stream are collected before they are sent
+STREAM_DIGEST_INTERVAL = 1.0
+
+# Topics seen on the converter that are not registered as groups yet
+unregistered_topics: Set[str] = set()
+# Set when a full batch of topics seen on the stream is waiting to be registered
+registration_due = asyncio.Event()
+# Alarms raised by the value stream, a burst of them reaches each user as one message
+stream_digest = Digest(DIGEST_MAX_ALARMS)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    # Times a stage of the limit checks both as a metric and as a span
+    with CHECK_LIMITS_DURATION.labels(name).time(), tracer.span(f'check_limits.{name}'):
+        yield
+
+def send_digest(digest: Digest) -> None:
+    for user_id, text in digest.messages():
+        notifier.send(user_id, text)
+
+class Transition(NamedTuple):
+    topic: str
+    subscriber: Subscriber
+    current_value: str
+    # RAISED, ACTIVE or CLEARED
+    transition: str
+    # Time the alarm was last reported before the transition, None if it was not active
+    notified_at: Optional[float]
+
+def check_subscriber(topic: str, subscriber: Subscriber, current_value: str, current_value_float: float,
+                     transitions: List[Transition]) -> None:
+    key = (subscriber.user_id, topic, subscriber.limit_name)
+    notified_at = alarm_tracker.alarms.get(key, None)
+    transition = alarm_tracker.update(subscriber.user_id, topic, subscriber.limit_name, subscriber.threshold,
+                                      current_value_float)
+    if transition is not None:
+        transitions.append(Transition(topic, subscriber, current_value, transition, notified_at))
+
+async def report_transitions(transitions: List[Transition], digest: Digest) -> None:
+    if not transitions:
+        return
+    try:
+        # One write for all the transitions of a check
+        await alarm_tracker.save(data_base, [(item.subscriber.user_id, item.topic, item.subscriber.limit_name)
+                                             for item in transitions])
+    except Exception:
+        # Not reported yet, the next check finds the same transitions
+        for item in reversed(transitions):
+            alarm_tracker.restore((item.subscriber.user_id, item.topic, item.subscriber.limit_name), item.notified_at)
+        raise
+    for item in transitions:
+        limit_name = item.subscriber.limit_name
+        limit = LIMITS.get(limit_name, DEFAULT_LIMIT)
+        callback = clear_limit_default if item.transition == CLEARED else limit.callback
+        text = await callback(limit_name, item.subscriber.limit_value, item.current_value, item.topic,
+                              item.subscriber.user_id)
+        if limit.digest:
+            digest.add(item.subscriber.user_id, text)
+        else:
+            notifier.send(item.subscriber.user_id, text)
+
+async def check_topic(topic: str, digest: Digest) -> None:
+    subscribers = limit_index.get(topic)
+    if not subscribers:
+        return
+    # Parsed once when the value was stored
+    current_value_float = topic_values.get_number(topic)
+    if current_value_float is None:
+        logging.debug(f'Current value for topic {topic} is not a number')
+        LIMIT_EVALUATIONS_SKIPPED.inc(len(subscribers))
+        return
+    current_value = topic_values.get(topic)
+    LIMIT_EVALUATIONS.inc(len(subscribers))
+    transitions: List[Transition] = []
+    for subscriber in subscribers:
+        check_subscriber(topic, subscriber, current_value, current_value_float, transitions)
+    await report_transitions(transitions, digest)
+
 async def check_limits() -> None:
     logging.info('Check limits')
-    user_ids = data_base.list_users()
-    for user_id in user_ids:
-        user_config = data_base.get_config(user_id)
-        if user_config is None:
-            continue
-        limit_config = user_config.get('limits', None)
-        if limit_config is None:
-            continue
-        for topic, limits in limit_config.items():
-            try:
-                current_value = await get_value_async(SERVER_ADDRESS, SERVER_PORT, topic)
-                current_value_float = float(current_value)
-            except (ValueError, TypeError):
-                logging.error(f"Error: Current value for topic {topic} is not convertible to float")
-                continue
-            for limit_name, limit_value in limits.items():
-                if (limit_name.startswith('lower') and float(limit_value) > current_value_float) or \
-                   (limit_name.startswith('upper') and float(limit_value) < current_value_float):
-                        callback = LIMITS.get(limit_name, exceed_limit_default)
-                        await callback(limit_name, limit_value, current_value, topic, user_id)
+    if not limit_index.loaded:
+        with stage('load_limits'):
+            await limit_index.load(data_base)
+    if not alarm_tracker.loaded:
+        with stage('load_alarms'):
+            await alarm_tracker.load(data_base)
+    arrays = limit_index.arrays()
+    if not arrays.topic_names or topic_values.version is None:
+        return
+    changed_topics = topic_values.take_changed()
+    dirty_users = limit_index.take_dirty()
+    digest = Digest(DIGEST_MAX_ALARMS)
+    try:
+        with stage('compare'):
+            renotify = alarm_tracker.renotify_interval > 0
+            active = arrays.mask(alarm_tracker.alarms)
+            if dirty_users is None:
+                # Limits (re)loaded, compare all of them
+                positions = np.arange(len(arrays))
+            else:
+                # Only the limits on changed topics, the edited ones, and the alarms due for a reminder
+                positions = arrays.select(changed_topics, dirty_users)
+                if renotify:
+                    positions = np.union1d(positions, np.flatnonzero(active))
+            LIMIT_EVALUATIONS.inc(len(positions))
+            LIMIT_EVALUATIONS_SKIPPED.inc(len(arrays) - len(positions))
+            if not len(positions):
+                return
+            # Compare the selected limits at once, only the alarms changing state are handled one by one
+            values = np.full(len(arrays.topic_names), np.nan)
+            topic_ids = np.unique(arrays.topic_ids[positions])
+            values[topic_ids] = np.fromiter(
+                (topic_values.numbers.get(arrays.topic_names[topic_id], np.nan) for topic_id in topic_ids.tolist()),
+                np.float64, len(topic_ids))
+            candidates = arrays.candidates(values, active, alarm_tracker.hysteresis, renotify, positions)
+            transitions: List[Transition] = []
+            for position in candidates.tolist():
+                topic, subscriber = arrays.topic(position), arrays.subscribers[position]
+                # The value the candidates were found with, never NaN for a candidate
+                current_value_float = float(values[arrays.topic_ids[position]])
+                check_subscriber(topic, subscriber, topic_values.get(topic), current_value_float, transitions)
+        with stage('save'):
+            await report_transitions(transitions, digest)
+    except Exception:
+        # Compare them again in the next cycle
+        topic_values.changed.update(changed_topics)
+        limit_index.mark_dirty(dirty_users)
+        raise
+    finally:
+        with stage('send'):
+            send_digest(digest)
 
-async def server_polling(host, port, generator, timeout) -> None:
-    logging.info('Start polling')
+async def sync_values() -> None:
+    # Download the first snapshot, then only the values changed since the last sync
+    with stage('fetch'):
+        if topic_values.version is None:
+            snapshot = await converter_client.get_snapshot()
+            version, values = snapshot['version'], snapshot['values']
+        else:
+            changes = await converter_client.get_changes(topic_values.version)
+            version, values = changes['version'], changes['values']
+    unregistered_topics.update(topic_values.update(values, version))
+    logging.info(f'Synced {len(values)} changed value(s), version {version}')
+
+async def add_topics(generator) -> None:
+    if not unregistered_topics:
+        return
+    topics = set(unregistered_topics)
+    groups_set = set(await data_base.list_groups())
+    new_topics = sorted(topics - groups_set)
+    logging.info(f'New topics: {new_topics}')
+    if new_topics:
+        passwords = {topic: generator() for topic in new_topics}
+        added_topics = await data_base.add_groups(passwords)
+        password_infos = [f'Password for {topic} groups is: {passwords[topic]}' for topic in added_topics]
+        for password_info in password_infos:
+            logging.info(password_info)
+        for message in split_message(password_infos):
+            for id in ADMIN_IDS:
+                notifier.send(id, message)
+    unregistered_topics.difference_update(topics)
+
+async def check_limits_periodically(interval: float) -> None:
+    # Compares the limits edited while the stream is open and the alarms due for a reminder,
+    # the stream only compares the limits of the topics it receives
     while True:
+        await asyncio.sleep(max(interval, MIN_CHECK_INTERVAL))
         try:
-            topics = await list_topics_async(host, port)
-            topics_list: list[str] = []
-            if topics:
-                topics_list = topics.split(',')
-            groups_list = data_base.list_groups()
-            topics_list = [x for x in topics_list if x not in groups_list]
-            logging.info(f'topics list: {topics_list}')
-            for topic in topics_list:
-                password = generator()
-                data_base.add_group(topic, password)
-                password_info = f'Password for {topic} groups is: {password}'
-                logging.info(password_info)
-                for id in ADMIN_IDS:
-                    await bot.send_message(id, password_info)
+            await check_limits()
         except Exception as e:
-            logging.error(f'Error adding topics to database: {e}') 
+            logging.error(f'Error checking limits: {e}')
+
+async def send_digest_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        send_digest(stream_digest)
+
+async def register_topics_periodically(generator, delay: float) -> None:
+    # Registers the topics seen on the stream together, once a batch is full or after the delay
+    while True:
         try:
-            await check_limits()
+            await asyncio.wait_for(registration_due.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        registration_due.clear()
+        try:
+            await add_topics(generator)
+        except Exception as e:
+            logging.error(f'Error adding topics to database: {e}')
+
+async def listen_values(generator, check_interval: float) -> None:
+    logging.info('Listen value stream')
+    tasks = [asyncio.create_task(check_limits_periodically(check_interval)),
+             asyncio.create_task(register_topics_periodically(generator, REGISTER_DELAY)),
+             asyncio.create_task(send_digest_periodically(STREAM_DIGEST_INTERVAL))]
+    try:
+        await receive_values()
+    finally:
+        # Topics still waiting are registered by the next poll
+        for task in tasks:
+            task.cancel()
+        send_digest(stream_digest)
+
+async def receive_values() -> None:
+    # The values changed since the last sync are replayed first
+    async for event in converter_client.stream(topic_values.version):
+        topic = event['topic']
+        with tracer.span('stream_event', topic=topic):
+            new, changed = topic_values.set(topic, event['value'], event['version'])
+            if new:
+                unregistered_topics.add(topic)
+                if len(unregistered_topics) >= REGISTER_BATCH_SIZE:
+                    registration_due.set()
+            if not changed:
+                # A repeated value leaves every alarm as it is, reminders are sent by the periodic check
+                LIMIT_EVALUATIONS_SKIPPED.inc(len(limit_index.get(topic)))
+                continue
+            try:
+                # Panic alarms are sent at once, the others wait for the next digest
+                await check_topic(topic, stream_digest)
+            except Exception as e:
+                logging.error(f'Error checking limits: {e}')
+                # Compare it again in the next periodic check
+                topic_values.changed.add(topic)
+
+async def server_polling(generator, timeout) -> None:
+    logging.info('Start polling')
+    while True:
+        # Catch up on start and after every reconnect, only what changed while disconnected is downloaded
+        with tracer.span('poll_cycle'):
+            try:
+                await sync_values()
+            except Exception as e:
+                logging.error(f'Error syncing values: {e}') 
+            try:
+                await add_topics(generator)
+            except Exception as e:
+                logging.error(f'Error adding topics to database: {e}') 
+            try:
+                await check_limits()
+            except Exception as e:
+                logging.error(f'Error checking limits: {e}') 
+        try:
+            await listen_values(generator, timeout)
         except Exception as e:
-            logging.error(f'Error checking limits: {e}') 
-        await asyncio.sleep(timeout)
\ No newline at end of file
+            logging.error(f'Value stream is interrupted: {e}')
+        await asyncio.sleep(timeout)
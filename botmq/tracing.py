@@ -0,0 +1,268 @@
+import cProfile
+import itertools
+import json
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+import aiohttp
+
+FORMATS = ('jsonl', 'chrome')
+
+class Span:
+    """
+    A timed operation, nested in the span that was current when it started.
+
+    Attributes:
+        name (str): Name of the operation, prefixed with its component, e.g. 'db.get_group'.
+        span_id (int): Identifier of the span, unique in the process.
+        parent_id (Optional[int]): Identifier of the enclosing span, None for a root span.
+        trace_id (int): Identifier of the root span, shared by all its nested spans.
+        start (float): Start time as a Unix timestamp.
+        attributes (Dict[str, Any]): Details recorded with the span.
+    """
+    __slots__ = ('name', 'span_id', 'parent_id', 'trace_id', 'start', 'start_counter', 'attributes')
+
+    def __init__(self, name: str, span_id: int, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.name: str = name
+        self.span_id: int = span_id
+        self.parent_id: Optional[int] = parent.span_id if parent is not None else None
+        self.trace_id: int = parent.trace_id if parent is not None else span_id
+        self.start: float = time.time()
+        self.start_counter: float = time.perf_counter()
+        self.attributes: Dict[str, Any] = attributes
+
+# Span of the running update, poll cycle or request, followed across awaits
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+class Tracer:
+    """
+    Records nested spans to a local file.
+
+    Spans are written when they end, as JSON lines or as a Chrome trace that can be
+    opened in chrome://tracing or https://ui.perfetto.dev. A Chrome trace is left
+    without its closing bracket, which both viewers accept, so it stays valid if
+    the bot is killed. Tracing is disabled until `open` is called.
+    """
+    def __init__(self):
+        self.file: Optional[TextIO] = None
+        self.output_format: str = 'jsonl'
+        self.pid: int = os.getpid()
+        self._ids = itertools.count(1)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are recorded."""
+        return self.file is not None
+
+    def open(self, path: str, output_format: str = 'jsonl') -> None:
+        """
+        Start recording spans.
+
+        Args:
+            path (str): File the spans are written to. JSON lines are appended,
+                        a Chrome trace replaces the file.
+            output_format (str): 'jsonl' or 'chrome'.
+
+        Raises:
+            ValueError: If the format is unknown.
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f'Unknown trace format {output_format!r}, choose from {", ".join(FORMATS)}')
+        self.close()
+        self.output_format = output_format
+        if output_format == 'chrome':
+            self.file = open(path, 'w')
+            self.file.write('[\n')
+        else:
+            self.file = open(path, 'a')
+
+    def close(self) -> None:
+        """Stop recording spans and flush the file."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def current(self) -> Optional[Span]:
+        """Return the span of the running operation, if any."""
+        return _current_span.get()
+
+    def start(self, name: str, **attributes: Any) -> Span:
+        """
+        Start a span nested in the current one without making it current.
+
+        Used for operations whose start and end are signalled by separate callbacks.
+
+        Args:
+            name (str): Name of the operation.
+            **attributes: Details recorded with the span.
+
+        Returns:
+            Span: The started span, to be passed to `finish`.
+        """
+        return Span(name, next(self._ids), _current_span.get(), attributes)
+
+    def finish(self, span: Span) -> None:
+        """
+        End a span and write it.
+
+        Args:
+            span (Span): Span returned by `start`.
+        """
+        if self.file is None:
+            return
+        duration = time.perf_counter() - span.start_counter
+        if self.output_format == 'chrome':
+            record = {
+                'name': span.name,
+                'cat': span.name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': round(span.start * 1e6),
+                'dur': round(duration * 1e6),
+                'pid': self.pid,
+                # One row per trace, so concurrent updates do not overlap
+                'tid': span.trace_id,
+                'args': {'span': span.span_id, 'parent': span.parent_id, **span.attributes},
+            }
+            self.file.write(json.dumps(record, default=str) + ',\n')
+        else:
+            record = {
+                'name': span.name,
+                'trace': span.trace_id,
+                'span': span.span_id,
+                'parent': span.parent_id,
+                'start': span.start,
+                'duration_ms': round(duration * 1000, 3),
+                'attributes': span.attributes,
+            }
+            self.file.write(json.dumps(record, default=str) + '\n')
+        if span.parent_id is None:
+            self.file.flush()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        Record the enclosed block as a span nested in the current one.
+
+        Args:
+            name (str): Name of the operation.
+            **attributes: Details recorded with the span.
+
+        Yields:
+            Optional[Span]: The span, None if tracing is disabled.
+        """
+        if self.file is None:
+            yield None
+            return
+        span = self.start(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes['error'] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def trace_config(self, prefix: str) -> aiohttp.TraceConfig:
+        """
+        Build an aiohttp trace config recording a span per HTTP request.
+
+        Args:
+            prefix (str): Component name the spans are prefixed with.
+
+        Returns:
+            aiohttp.TraceConfig: Trace config to pass to a client session.
+        """
+        async def on_request_start(session, context: SimpleNamespace, params) -> None:
+            if self.file is not None:
+                context.span = self.start(f'{prefix}.{params.method} {params.url.path}')
+
+        async def on_request_end(session, context: SimpleNamespace, params) -> None:
+            span = getattr(context, 'span', None)
+            if span is not None:
+                span.attributes['status'] = params.response.status
+                self.finish(span)
+
+        async def on_request_exception(session, context: SimpleNamespace, params) -> None:
+            span = getattr(context, 'span', None)
+            if span is not None:
+                span.attributes['error'] = type(params.exception).__name__
+                self.finish(span)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+class Profiler:
+    """
+    Runtime-toggled cProfile of the event loop thread.
+
+    The profile covers everything the bot runs while it is enabled, handlers,
+    polling and notifications alike.
+    """
+    def __init__(self, directory: str = '.', top: int = 20):
+        """
+        Initialize the profiler.
+
+        Args:
+            directory (str): Directory the collected profiles are saved to.
+            top (int): Number of functions listed in a summary.
+        """
+        self.directory: str = directory
+        self.top: int = top
+        self.profile: Optional[cProfile.Profile] = None
+        self.started: float = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Whether a profile is being collected."""
+        return self.profile is not None
+
+    def start(self) -> None:
+        """Start collecting a profile, restarting a running one."""
+        if self.profile is not None:
+            self.profile.disable()
+        self.profile = cProfile.Profile()
+        self.started = time.time()
+        self.profile.enable()
+
+    def stop(self) -> Tuple[Optional[str], List[str]]:
+        """
+        Stop collecting and save the profile.
+
+        Returns:
+            Tuple[Optional[str], List[str]]: Path of the saved profile, readable with pstats or snakeviz,
+                                             None if it could not be saved, and the functions with
+                                             the highest cumulative time.
+
+        Raises:
+            RuntimeError: If no profile is being collected.
+        """
+        if self.profile is None:
+            raise RuntimeError('Profiler is not running')
+        self.profile.disable()
+        profile, self.profile = self.profile, None
+        duration = time.time() - self.started
+        path = os.path.join(self.directory, f'botmq-{datetime.fromtimestamp(self.started):%Y%m%d-%H%M%S-%f}.prof')
+        stats = pstats.Stats(profile)
+        try:
+            stats.dump_stats(path)
+            lines = [f'Profiled {duration:.1f}s, saved to {path}']
+        except OSError as e:
+            path = None
+            lines = [f'Profiled {duration:.1f}s, not saved: {e}']
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        for (file_name, line, function), (_, calls, _, cumulative, _) in functions[:self.top]:
+            lines.append(f'{cumulative:.3f}s {calls}x {os.path.basename(file_name)}:{line}({function})')
+        return path, lines
+
+tracer = Tracer()
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entries.
+
+    Attributes:
+        maxsize (int): Maximum number of entries.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups not found in the cache.
+    """
+    def __init__(self, maxsize: int):
+        """
+        Initialize an empty cache.
+
+        Args:
+            maxsize (int): Maximum number of entries.
+        """
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self.data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value of a key and mark it as recently used.
+
+        Args:
+            key (Hashable): The key.
+            default (Any): Value returned if the key is not cached.
+        """
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (Hashable): The key.
+            value (Any): The value.
+        """
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Remove a key if it is cached.
+
+        Args:
+            key (Hashable): The key.
+        """
+        self.data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.data.clear()
+
+    def __len__(self) -> int:
+        return len(self.data)
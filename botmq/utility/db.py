@@ -1,68 +1,60 @@
-from botmq.loader import data_base
-from typing import Any, Dict, Optional
+import asyncio
 
-def set_limit(user_id: int, topic: str, limit: str, value: Any) -> None:
-    user_config = data_base.get_config(user_id)
-    if user_config is None:
-        user_config = {}
-    if 'limits' not in user_config:
-        user_config['limits'] = {}
-    limits_config = user_config['limits']
-    if topic not in limits_config:
-        limits_config[topic] = {}
-    limits_config[topic][limit] = value
-    user_config['limits'] = limits_config
-    data_base.set_config(user_id, user_config)
+from botmq.loader import data_base, limit_index
+from botmq.data.config import USER_CONFIG_CACHE_SIZE
+from botmq.utility.cache import LRUCache
+from typing import Any, Dict, Iterable, Optional
 
-def get_limit(user_id: int, topic: str, limit: str) -> Optional[Any]:
-    user_config = data_base.get_config(user_id)
-    if user_config is None:
-        return None
-    if 'limits' not in user_config:
-        return None
-    limits_config = user_config['limits']
-    if topic not in limits_config:
-        return None
-    return limits_config[topic][limit]
+# Limits and renames of each user, written through on every change
+config_cache = LRUCache(USER_CONFIG_CACHE_SIZE)
 
-def list_limits(user_id: int) -> Optional[Dict[str, Any]]:
-    user_config = data_base.get_config(user_id)
+async def get_config(user_id: int) -> Dict[str, Dict]:
+    # Limits and renames of the user, loaded once and kept in the cache
+    user_config = config_cache.get(user_id, None)
     if user_config is None:
+        limits, renames = await asyncio.gather(data_base.get_limits(user_id), data_base.get_renames(user_id))
+        user_config = {'limits': limits, 'renames': renames}
+        config_cache.set(user_id, user_config)
+    return user_config
+
+async def set_limit(user_id: int, topic: str, limit: str, value: Any) -> None:
+    await data_base.set_limit(user_id, topic, limit, value)
+    limits_config = (await get_config(user_id))['limits']
+    limits_config.setdefault(topic, {})[limit] = value
+    limit_index.set_user(user_id, limits_config)
+
+async def get_limit(user_id: int, topic: str, limit: str) -> Optional[Any]:
+    limits_config = (await get_config(user_id))['limits']
+    return limits_config.get(topic, {}).get(limit, None)
+
+async def list_limits(user_id: int) -> Optional[Dict[str, Any]]:
+    limits_config = (await get_config(user_id))['limits']
+    if not limits_config:
         return None
-    if 'limits' not in user_config:
-        return None
-    return user_config['limits']
+    return limits_config
 
-def set_rename(user_id: int, topic: str, new_name: str) -> None:
-    user_config = data_base.get_config(user_id)
-    if user_config is None:
-        user_config = {}
-    if 'renames' not in user_config:
-        user_config['renames'] = {}
-    renames_config = user_config['renames']
+async def set_rename(user_id: int, topic: str, new_name: str) -> None:
+    await data_base.set_rename(user_id, topic, new_name)
+    renames_config = (await get_config(user_id))['renames']
     renames_config[topic] = new_name
-    user_config['renames'] = renames_config
-    data_base.set_config(user_id, user_config)
 
-def get_rename(user_id: int, topic: str) -> Optional[str]:
-    user_config = data_base.get_config(user_id)
-    if user_config is None:
-        return None
-    if 'renames' not in user_config:
-        return None
-    renames_config = user_config['renames']
+async def get_rename(user_id: int, topic: str) -> Optional[str]:
+    renames_config = (await get_config(user_id))['renames']
     return renames_config.get(topic, None)
 
-def list_renames(user_id: int) -> Optional[Dict[str, Any]]:
-    user_config = data_base.get_config(user_id)
-    if user_config is None:
+async def list_renames(user_id: int) -> Optional[Dict[str, Any]]:
+    renames_config = (await get_config(user_id))['renames']
+    if not renames_config:
         return None
-    if 'renames' not in user_config:
-        return None
-    return user_config['renames']
+    return renames_config
 
-def get_topic_name(user_id: int, topic: str) -> str:
-    topic_name = get_rename(user_id, topic)
+async def get_topic_name(user_id: int, topic: str) -> str:
+    topic_name = await get_rename(user_id, topic)
     if topic_name is None:
         return topic
     return topic_name
+
+async def get_topic_names(user_id: int, topics: Iterable[str]) -> Dict[str, str]:
+    # Display names of several topics with one config lookup
+    renames_config = (await get_config(user_id))['renames']
+    return {topic: renames_config.get(topic, topic) for topic in topics}
@@ -0,0 +1,49 @@
+from typing import Dict, Iterator, List, Tuple
+
+from botmq.utility.format import split_message
+
+class Digest:
+    """
+    Alarm messages collected per user during one evaluation pass.
+
+    Every user gets one message listing all their alarms, split only where it would
+    exceed Telegram's message length limit.
+    """
+    def __init__(self, max_alarms: int = 50):
+        """
+        Initialize an empty digest.
+
+        Args:
+            max_alarms (int): Maximum number of alarms listed per user, the rest are only counted.
+        """
+        self.max_alarms: int = max_alarms
+        self.alarms: Dict[int, List[str]] = {}
+
+    def add(self, user_id: int, text: str) -> None:
+        """
+        Add an alarm message for a user.
+
+        Args:
+            user_id (int): The ID of the user.
+            text (str): The alarm message.
+        """
+        self.alarms.setdefault(user_id, []).append(text)
+
+    def messages(self) -> Iterator[Tuple[int, str]]:
+        """
+        Return the digest messages and empty the digest.
+
+        Yields:
+            Tuple[int, str]: User ID and text of each message.
+        """
+        alarms, self.alarms = self.alarms, {}
+        for user_id, texts in alarms.items():
+            if len(texts) == 1:
+                yield user_id, texts[0]
+                continue
+            lines = [f'{len(texts)} alarms:']
+            lines.extend(f'- {text}' for text in texts[:self.max_alarms])
+            if len(texts) > self.max_alarms:
+                lines.append(f'...and {len(texts) - self.max_alarms} more')
+            for message in split_message(lines):
+                yield user_id, message
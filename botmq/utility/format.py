@@ -1,4 +1,37 @@
 import re
+from typing import Iterable, List
+
+# Maximum length of a Telegram text message
+MESSAGE_LENGTH_LIMIT = 4096
 
 def format_to_title_case(s: str) -> str:
-    return re.sub(r'_([a-z])', lambda x: ' ' + x.group(1).upper(), s).title()
\ No newline at end of file
+    return re.sub(r'_([a-z])', lambda x: ' ' + x.group(1).upper(), s).title()
+
+def split_message(lines: Iterable[str], limit: int = MESSAGE_LENGTH_LIMIT) -> List[str]:
+    """
+    Join lines into as few messages as possible, none longer than the limit.
+
+    Args:
+        lines (Iterable[str]): Lines of text, without trailing newlines.
+        limit (int): Maximum length of a message.
+
+    Returns:
+        List[str]: Messages, lines longer than the limit are cut into several messages.
+    """
+    messages: List[str] = []
+    current: List[str] = []
+    length = 0
+    for line in lines:
+        # +1 for the newline joining it to the current message
+        if current and length + 1 + len(line) > limit:
+            messages.append('\n'.join(current))
+            current = []
+            length = 0
+        while len(line) > limit:
+            messages.append(line[:limit])
+            line = line[limit:]
+        length += len(line) + (1 if current else 0)
+        current.append(line)
+    if current:
+        messages.append('\n'.join(current))
+    return messages
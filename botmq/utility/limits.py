@@ -0,0 +1,281 @@
+import itertools
+import logging
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+# Direction of each limit: -1 for lower limits, exceeded below the threshold, 1 for upper limits
+LIMIT_DIRECTIONS: Dict[str, float] = {
+    'lower_limit': -1.0,
+    'upper_limit': 1.0,
+    'lower_panic': -1.0,
+    'upper_panic': 1.0,
+}
+
+class Subscriber(NamedTuple):
+    """Limit of a user on a topic."""
+    user_id: int
+    limit_name: str
+    limit_value: Any
+    threshold: float
+
+class LimitArrays:
+    """
+    Columnar copy of the limits for comparing all of them in one NumPy operation.
+
+    Limit i is `subscribers[i]` on topic `topic_names[topic_ids[i]]`, its threshold is
+    `thresholds[i]` and its direction `directions[i]`: -1 for lower limits, exceeded
+    below the threshold, and 1 for upper limits, exceeded above it.
+    """
+    def __init__(self, topics: Mapping[str, List[Subscriber]]):
+        """
+        Compile the limits.
+
+        Args:
+            topics (Mapping[str, List[Subscriber]]): Limits of every user by topic.
+        """
+        self.topic_names: List[str] = list(topics)
+        self.topic_positions: Dict[str, int] = {topic: topic_id for topic_id, topic in enumerate(self.topic_names)}
+        self.subscribers: List[Subscriber] = list(itertools.chain.from_iterable(topics.values()))
+        count = len(self.subscribers)
+        counts = [len(subscribers) for subscribers in topics.values()]
+        self.topic_ids: np.ndarray = np.repeat(np.arange(len(self.topic_names)), counts)
+        # The limits of a topic are contiguous, from offsets[topic_id] to offsets[topic_id + 1]
+        self.offsets: np.ndarray = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+        self.user_ids: np.ndarray = np.fromiter(
+            (subscriber.user_id for subscriber in self.subscribers), np.int64, count)
+        self.thresholds: np.ndarray = np.fromiter(
+            (subscriber.threshold for subscriber in self.subscribers), np.float64, count)
+        self.directions: np.ndarray = np.fromiter(
+            (LIMIT_DIRECTIONS[subscriber.limit_name] for subscriber in self.subscribers),
+            np.float64, count)
+        self._positions: Optional[Dict[Tuple[int, str, str], int]] = None
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def topic(self, position: int) -> str:
+        """
+        Return the topic of a limit.
+
+        Args:
+            position (int): Position of the limit.
+
+        Returns:
+            str: The topic.
+        """
+        return self.topic_names[self.topic_ids[position]]
+
+    def mask(self, keys: Iterable[Tuple[int, str, str]]) -> np.ndarray:
+        """
+        Mark a set of limits.
+
+        Args:
+            keys (Iterable[Tuple[int, str, str]]): (user ID, topic, limit name) of the limits,
+                                                   unknown ones are ignored.
+
+        Returns:
+            np.ndarray: Boolean array, True for the given limits.
+        """
+        mask = np.zeros(len(self.subscribers), np.bool_)
+        mask[self.positions_of(keys)] = True
+        return mask
+
+    def positions_of(self, keys: Iterable[Tuple[int, str, str]]) -> np.ndarray:
+        """
+        Find a set of limits.
+
+        Args:
+            keys (Iterable[Tuple[int, str, str]]): (user ID, topic, limit name) of the limits,
+                                                   unknown ones are ignored.
+
+        Returns:
+            np.ndarray: Positions of the limits.
+        """
+        keys = list(keys)
+        if not keys:
+            return np.empty(0, np.int64)
+        if self._positions is None:
+            # Only needed once an alarm is active
+            self._positions = {(subscriber.user_id, self.topic_names[topic_id], subscriber.limit_name): position
+                               for position, (topic_id, subscriber)
+                               in enumerate(zip(self.topic_ids.tolist(), self.subscribers))}
+        return np.fromiter((self._positions[key] for key in keys if key in self._positions), np.int64)
+
+    def select(self, topics: Iterable[str] = (), user_ids: Iterable[int] = ()) -> np.ndarray:
+        """
+        Find the limits on some topics or of some users.
+
+        Args:
+            topics (Iterable[str]): Topics whose limits are selected, unknown ones are ignored.
+            user_ids (Iterable[int]): Users whose limits are selected.
+
+        Returns:
+            np.ndarray: Sorted positions of the selected limits.
+        """
+        topic_ids = [self.topic_positions[topic] for topic in topics if topic in self.topic_positions]
+        ranges = [np.arange(self.offsets[topic_id], self.offsets[topic_id + 1]) for topic_id in topic_ids]
+        user_ids = list(user_ids)
+        if user_ids:
+            ranges.append(np.flatnonzero(np.isin(self.user_ids, user_ids)))
+        if not ranges:
+            return np.empty(0, np.int64)
+        return np.unique(np.concatenate(ranges))
+
+    def candidates(self, values: np.ndarray, active: np.ndarray, hysteresis: float = 0.0,
+                   renotify: bool = False, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Find the limits whose alarm may change state.
+
+        Args:
+            values (np.ndarray): Current value of each topic of `topic_names`, NaN if unknown or not numeric.
+            active (np.ndarray): Boolean array, True for the limits with an active alarm.
+            hysteresis (float): How far inside the limit the value must get to clear an alarm.
+            renotify (bool): Whether active alarms may have to be reported again.
+            positions (Optional[np.ndarray]): Positions of the limits to compare, all limits if None.
+
+        Returns:
+            np.ndarray: Positions of the exceeded limits without an alarm, and of the active alarms
+                        that are cleared or, if `renotify`, still exceeded.
+        """
+        if positions is None:
+            topic_ids, thresholds, directions = self.topic_ids, self.thresholds, self.directions
+        else:
+            topic_ids, thresholds, directions = self.topic_ids[positions], self.thresholds[positions], self.directions[positions]
+            active = active[positions]
+        # Positive beyond the limit, whatever its direction; NaN compares as False
+        excess = (values[topic_ids] - thresholds) * directions
+        changed = np.where(active, excess <= -hysteresis, excess > 0)
+        if renotify:
+            changed |= active & ~np.isnan(excess)
+        found = np.flatnonzero(changed)
+        return found if positions is None else positions[found]
+
+class LimitIndex:
+    """
+    Inverted index from topic to the limits of all users watching it.
+
+    Built once from the limits table and kept up to date by `set_user`
+    whenever a user's limits are written. Its columnar copy is compiled on
+    first use after a change, and the users whose limits were written since
+    the last check are kept so only their limits are compared again.
+    """
+    def __init__(self):
+        """Initialize an empty index."""
+        self.loaded: bool = False
+        self.topics: Dict[str, List[Subscriber]] = {}
+        self.users: Dict[int, Dict[str, List[Subscriber]]] = {}
+        self._arrays: Optional[LimitArrays] = None
+        # Users whose limits changed since `take_dirty`, None if all limits have to be compared
+        self.dirty: Optional[Set[int]] = None
+
+    async def load(self, data_base) -> None:
+        """
+        Rebuild the index from the limits stored in the database.
+
+        Args:
+            data_base: Database context used to read the limits.
+        """
+        limits: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        for user_id, topic, limit_name, limit_value in await data_base.list_limits():
+            limits.setdefault(user_id, {}).setdefault(topic, {})[limit_name] = limit_value
+        self.topics = {}
+        self.users = {}
+        self._arrays = None
+        for user_id, user_limits in limits.items():
+            self.set_user(user_id, user_limits)
+        self.loaded = True
+        self.dirty = None
+        logging.info(f'Limit index loaded: {len(self.topics)} topics, {len(self.users)} users')
+
+    def set_user(self, user_id: int, limits: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        """
+        Replace all limits of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+            limits (Optional[Dict[str, Dict[str, Any]]]): Limits config of the user
+                                                          (topic -> limit name -> value).
+        """
+        self._arrays = None
+        if self.dirty is not None:
+            self.dirty.add(user_id)
+        for topic in self.users.pop(user_id, {}):
+            subscribers = [x for x in self.topics[topic] if x.user_id != user_id]
+            if subscribers:
+                self.topics[topic] = subscribers
+            else:
+                del self.topics[topic]
+        if not limits:
+            return
+        user_topics: Dict[str, List[Subscriber]] = {}
+        for topic, topic_limits in limits.items():
+            for limit_name, limit_value in topic_limits.items():
+                if limit_name not in LIMIT_DIRECTIONS:
+                    logging.error(f'Error: unknown limit {limit_name} of user {user_id} for topic {topic}')
+                    continue
+                try:
+                    threshold = float(limit_value)
+                except (ValueError, TypeError):
+                    logging.error(f'Error: {limit_name} limit of user {user_id} for topic {topic} is not convertible to float')
+                    continue
+                subscriber = Subscriber(user_id, limit_name, limit_value, threshold)
+                user_topics.setdefault(topic, []).append(subscriber)
+                self.topics.setdefault(topic, []).append(subscriber)
+        if user_topics:
+            self.users[user_id] = user_topics
+
+    def get(self, topic: str) -> List[Subscriber]:
+        """
+        Return all limits set on a topic.
+
+        Args:
+            topic (str): The topic.
+
+        Returns:
+            List[Subscriber]: Limits of every user watching the topic.
+        """
+        return self.topics.get(topic, [])
+
+    def take_dirty(self) -> Optional[Set[int]]:
+        """
+        Return the users whose limits changed since the previous call and forget them.
+
+        Returns:
+            Optional[Set[int]]: User IDs, None if the index was (re)loaded meanwhile.
+        """
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def mark_dirty(self, user_ids: Optional[Set[int]]) -> None:
+        """
+        Have the limits of some users compared again, e.g. after a failed check.
+
+        Args:
+            user_ids (Optional[Set[int]]): User IDs, None for all limits.
+        """
+        if user_ids is None:
+            self.dirty = None
+        elif self.dirty is not None:
+            self.dirty.update(user_ids)
+
+    def arrays(self) -> LimitArrays:
+        """
+        Return the columnar copy of the limits, compiling it if the limits changed.
+
+        Returns:
+            LimitArrays: Limits of every user on every topic.
+        """
+        if self._arrays is None:
+            self._arrays = LimitArrays(self.topics)
+            logging.info(f'Limit arrays compiled: {len(self._arrays)} limits')
+        return self._arrays
+
+    def list_topics(self) -> List[str]:
+        """
+        Return all topics that have at least one limit.
+
+        Returns:
+            List[str]: List of watched topics.
+        """
+        return list(self.topics.keys())
@@ -0,0 +1,114 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+def parse_number(value: Optional[str]) -> Optional[float]:
+    # Numeric value of a payload, None if it is not a number
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+class TopicValues:
+    """
+    Latest value of every converter topic, mirrored by the bot.
+
+    Kept in sync from the converter snapshot, its change feed and the value stream,
+    so a poll only downloads the values that changed since the previous one.
+    """
+    def __init__(self):
+        """Initialize an empty mirror."""
+        self.values: Dict[str, str] = {}
+        # Values parsed once when they change, only for numeric topics
+        self.numbers: Dict[str, float] = {}
+        # Topics whose value changed in a snapshot or a set of changes since `take_changed`
+        self.changed: Set[str] = set()
+        # Converter version the values are up to date with, None before the first snapshot
+        self.version: Optional[str] = None
+
+    def update(self, values: Dict[str, str], version: str) -> List[str]:
+        """
+        Apply a snapshot or a set of changes.
+
+        Args:
+            values (Dict[str, str]): Value of each added or changed topic.
+            version (str): Converter version after the changes.
+
+        Returns:
+            List[str]: Topics seen for the first time.
+        """
+        new_topics = [topic for topic in values if topic not in self.values]
+        for topic, value in values.items():
+            if self.values.get(topic, None) != value:
+                self.values[topic] = value
+                self._set_number(topic, value)
+                self.changed.add(topic)
+        self.version = version
+        return new_topics
+
+    def set(self, topic: str, value: str, version: str) -> Tuple[bool, bool]:
+        """
+        Apply a single value received from the stream.
+
+        Args:
+            topic (str): The topic.
+            value (str): The received value.
+            version (str): Converter version after the value was stored.
+
+        Returns:
+            Tuple[bool, bool]: Whether the topic was seen for the first time, and whether its value changed.
+        """
+        new = topic not in self.values
+        changed = self.values.get(topic, None) != value
+        if changed:
+            self.values[topic] = value
+            self._set_number(topic, value)
+        self.version = version
+        return new, changed
+
+    def get(self, topic: str) -> Optional[str]:
+        """
+        Get the latest value of a topic.
+
+        Args:
+            topic (str): The topic.
+
+        Returns:
+            Optional[str]: Latest value, or None if topic not found.
+        """
+        return self.values.get(topic, None)
+
+    def take_changed(self) -> Set[str]:
+        """
+        Return the topics changed by `update` since the previous call and forget them.
+
+        Values set from the stream are not included, they are checked when received.
+
+        Returns:
+            Set[str]: Changed topics.
+        """
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def get_number(self, topic: str) -> Optional[float]:
+        """
+        Get the latest value of a topic as a number.
+
+        Args:
+            topic (str): The topic.
+
+        Returns:
+            Optional[float]: Latest value, or None if topic not found or not numeric.
+        """
+        return self.numbers.get(topic, None)
+
+    def _set_number(self, topic: str, value: str) -> None:
+        number = parse_number(value)
+        if number is None:
+            self.numbers.pop(topic, None)
+        else:
+            self.numbers[topic] = number
+
+    def __contains__(self, topic: str) -> bool:
+        return topic in self.values
+
+    def __len__(self) -> int:
+        return len(self.values)
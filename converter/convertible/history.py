@@ -0,0 +1,146 @@
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+class RingBuffer:
+    """
+    Fixed-size buffer of the last numeric samples of a topic.
+
+    Samples are kept in two preallocated float64 arrays, so memory does not grow
+    with the number of received messages. NaN and infinite samples are dropped,
+    they cannot be aggregated nor sent as JSON.
+    """
+    def __init__(self, capacity: int):
+        """
+        Initialize an empty buffer.
+
+        Args:
+            capacity (int): Maximum number of samples kept.
+
+        Raises:
+            ValueError: If the capacity is lower than 1.
+        """
+        if capacity < 1:
+            raise ValueError(f'Ring buffer capacity must be at least 1, got {capacity}')
+        self.capacity: int = capacity
+        self.timestamps: array = array('d', bytes(8 * capacity))
+        self.values: array = array('d', bytes(8 * capacity))
+        # Index the next sample is written to and number of samples stored
+        self.head: int = 0
+        self.size: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    def append(self, timestamp: float, value: float) -> None:
+        """
+        Add a sample, overwriting the oldest one if the buffer is full.
+
+        Args:
+            timestamp (float): Receive time of the sample.
+            value (float): The sample, dropped if it is not finite.
+        """
+        if not math.isfinite(value):
+            return
+        with self.lock:
+            self.timestamps[self.head] = timestamp
+            self.values[self.head] = value
+            self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+
+    def samples(self) -> Tuple[array, array]:
+        """
+        Return a copy of the samples, oldest first.
+
+        Returns:
+            Tuple[array, array]: Timestamps and values.
+        """
+        with self.lock:
+            start = (self.head - self.size) % self.capacity
+            if start + self.size <= self.capacity:
+                end = start + self.size
+                return self.timestamps[start:end], self.values[start:end]
+            return (self.timestamps[start:] + self.timestamps[:self.head],
+                    self.values[start:] + self.values[:self.head])
+
+    def downsample(self, since: float, max_points: int) -> List[Dict[str, float]]:
+        """
+        Aggregate the samples received since a time into at most max_points buckets.
+
+        Args:
+            since (float): Only samples received at or after this time are used.
+            max_points (int): Maximum number of buckets.
+
+        Returns:
+            List[Dict[str, float]]: Start timestamp, min, max, avg and count of each non-empty bucket.
+        """
+        timestamps, values = self.samples()
+        first = bisect_left(timestamps, since)
+        count = len(timestamps) - first
+        if count <= 0 or max_points <= 0:
+            return []
+        if count <= max_points:
+            # Few enough samples to return them as they are
+            return [{'timestamp': timestamp, 'min': value, 'max': value, 'avg': value, 'count': 1}
+                    for timestamp, value in zip(timestamps[first:], values[first:])]
+        start = timestamps[first]
+        width = (timestamps[-1] - start) / max_points
+        buckets: List[Dict[str, float]] = []
+        bucket_index = -1
+        for i in range(first, len(timestamps)):
+            timestamp, value = timestamps[i], values[i]
+            index = min(int((timestamp - start) / width), max_points - 1) if width > 0 else 0
+            if index != bucket_index:
+                bucket_index = index
+                buckets.append({'timestamp': start + index * width, 'min': value, 'max': value, 'avg': 0.0, 'count': 0})
+            bucket = buckets[-1]
+            bucket['min'] = min(bucket['min'], value)
+            bucket['max'] = max(bucket['max'], value)
+            # Sum of the bucket until all samples are added
+            bucket['avg'] += value
+            bucket['count'] += 1
+        for bucket in buckets:
+            bucket['avg'] /= bucket['count']
+        return buckets
+
+class TopicHistory:
+    """Ring buffer of numeric samples for every topic."""
+    def __init__(self, capacity: int):
+        """
+        Initialize an empty history.
+
+        Args:
+            capacity (int): Number of samples kept per topic, 0 to keep none.
+        """
+        self.capacity: int = capacity
+        self.buffers: Dict[str, RingBuffer] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def append(self, topic: str, timestamp: float, value: float) -> None:
+        """
+        Add a sample to the history of a topic.
+
+        Args:
+            topic (str): The topic.
+            timestamp (float): Receive time of the sample.
+            value (float): The sample.
+        """
+        if self.capacity <= 0:
+            return
+        buffer = self.buffers.get(topic, None)
+        if buffer is None:
+            with self.lock:
+                buffer = self.buffers.setdefault(topic, RingBuffer(self.capacity))
+        buffer.append(timestamp, value)
+
+    def get(self, topic: str) -> Optional[RingBuffer]:
+        """
+        Get the ring buffer of a topic.
+
+        Args:
+            topic (str): The topic.
+
+        Returns:
+            Optional[RingBuffer]: The buffer, or None if no numeric sample was received.
+        """
+        return self.buffers.get(topic, None)
@@ -1,9 +1,20 @@
 import logging
-from typing import Dict, List, Optional
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import paho.mqtt.client as mqtt
 
+from .store import Reading, TopicStore
+from .history import TopicHistory
+from .parsing import PayloadParser
+from .trie import TopicFilter
+
+# Number of received messages between two summary log lines
+LOG_EVERY = 1000
+
 class Mqtt:
-    def __init__(self, address: str, port: int, username: str, password: str, topic: List[str]):
+    def __init__(self, address: str, port: int, username: str, password: str, topic: List[str],
+                 history_size: int = 256, include: Optional[List[str]] = None,
+                 exclude: Optional[List[str]] = None, rules: Optional[List[Dict[str, Any]]] = None):
         """
         Initialize MQTT client.
 
@@ -12,16 +23,42 @@ class Mqtt:
             port (int): MQTT broker port.
             username (str): Username for authentication.
             password (str): Password for authentication.
-            topic (List[str]): List of topics to subscribe to.
+            topic (List[str]): List of topic filters to subscribe to, may contain '+' and '#' wildcards.
+            history_size (int): Number of numeric samples kept per topic.
+            include (Optional[List[str]]): Topic filters of the received topics to keep,
+                                           the subscribed ones if None or empty.
+            exclude (Optional[List[str]]): Topic filters of the received topics to drop.
+            rules (Optional[List[Dict[str, Any]]]): Payload parsing rules by topic filter, see PayloadParser.
+
+        Raises:
+            ValueError: If a topic filter or a payload rule is invalid.
         """
         self.address: str = address
         self.port: int = port
         self.username: str = username
         self.password: str = password
         self.topic: List[str] = topic
-        self.data_dict: Dict[str, str] = {}
+        self.filter: TopicFilter = TopicFilter(include or topic, exclude or [])
+        # Number of received messages dropped by the filter
+        self.dropped: int = 0
+        self.parser: PayloadParser = PayloadParser(rules or [])
+        self.store: TopicStore = TopicStore()
+        self.history: TopicHistory = TopicHistory(history_size)
+        self.listeners: List[Callable[[str, Reading, int], None]] = []
         self.client: mqtt.Client = mqtt.Client()
 
+    def add_listener(self, listener: Callable[[str, Reading, int], None]) -> None:
+        """
+        Register a function called on every received message.
+
+        The listener is called from the MQTT network thread, so it must not block.
+
+        Args:
+            listener (Callable[[str, Reading, int], None]): Function taking topic, the stored reading
+                                                          and the store version after storing it.
+        """
+        self.listeners.append(listener)
+
     def on_message(self, client: mqtt.Client, userdata: str, msg: mqtt.MQTTMessage) -> None:
         """
         Callback function for message reception.
@@ -31,8 +68,22 @@ class Mqtt:
             userdata (str): User data.
             msg (mqtt.MQTTMessage): Received message.
         """
-        self.data_dict[msg.topic] = msg.payload.decode('utf-8')
-        logging.info(self.data_dict)
+        if not self.filter.match(msg.topic):
+            self.dropped += 1
+            return
+        timestamp = time.time()
+        for topic, value, number in self.parser.parse(msg.topic, msg.payload.decode('utf-8')):
+            reading = self.store.set(topic, value, timestamp, number)
+            # Only this thread writes the store, so the version is still the one set above
+            version = self.store.version
+            logging.debug(f'{topic}: {reading.value}')
+            if number is not None:
+                self.history.append(topic, timestamp, number)
+            if reading.sequence % LOG_EVERY == 0:
+                logging.info(f'Stored {reading.sequence} values on {len(self.store)} topics, '
+                             f'dropped {self.dropped} filtered out and {self.parser.errors} unparsable')
+            for listener in self.listeners:
+                listener(topic, reading, version)
 
     def on_connect(self, client: mqtt.Client, userdata: str, flags: dict, rc: int) -> None:
         """
@@ -45,7 +96,8 @@ class Mqtt:
             rc (int): Result code from connection attempt.
         """
         logging.info(f'Connected with result code {rc}')
-        self.client.subscribe([(topic, 0) for topic in self.topic])
+        if self.topic:
+            self.client.subscribe([(topic, 0) for topic in self.topic])
 
     def username_pw_set(self) -> None:
         """Set username and password for MQTT client."""
@@ -77,7 +129,77 @@ class Mqtt:
         Returns:
             Optional[str]: Latest value for the specified topic, or None if topic not found.
         """
-        return self.data_dict.get(topic, None)
+        reading = self.store.get(topic)
+        return reading.value if reading is not None else None
+
+    def get_reading(self, topic: str) -> Optional[Reading]:
+        """
+        Get the latest value, receive timestamp and sequence number for a given topic.
+
+        Args:
+            topic (str): Topic for which to retrieve the reading.
+
+        Returns:
+            Optional[Reading]: Latest reading for the specified topic, or None if topic not found.
+        """
+        return self.store.get(topic)
+
+    def get_history(self, topic: str, since: float, max_points: int) -> Optional[List[Dict[str, float]]]:
+        """
+        Get the downsampled history of a topic.
+
+        Args:
+            topic (str): Topic for which to retrieve the history.
+            since (float): Only samples received at or after this time are used.
+            max_points (int): Maximum number of points returned.
+
+        Returns:
+            Optional[List[Dict[str, float]]]: Start timestamp, min, max, avg and count of each point,
+                                              or None if no numeric value was received for the topic.
+        """
+        buffer = self.history.get(topic)
+        if buffer is None:
+            return None
+        return buffer.downsample(since, max_points)
+
+    def get_version(self) -> int:
+        """
+        Get the store version, bumped on every topic addition and value change.
+
+        Returns:
+            int: Current store version.
+        """
+        return self.store.version
+
+    def get_readings(self) -> Dict[str, Reading]:
+        """
+        Get the latest reading of every topic.
+
+        Returns:
+            Dict[str, Reading]: Latest reading by topic.
+        """
+        return self.store.get_all()
+
+    def get_snapshot(self) -> Tuple[int, Dict[str, str]]:
+        """
+        Get the value of every topic.
+
+        Returns:
+            Tuple[int, Dict[str, str]]: Store version and value of each topic.
+        """
+        return self.store.snapshot()
+
+    def get_changes(self, since: int) -> Tuple[int, Dict[str, str]]:
+        """
+        Get the topics added or changed after a version.
+
+        Args:
+            since (int): Version the caller is up to date with.
+
+        Returns:
+            Tuple[int, Dict[str, str]]: Store version and value of each changed topic.
+        """
+        return self.store.changes(since)
 
     def list_topics(self) -> List[str]:
         """
@@ -86,4 +208,4 @@ class Mqtt:
         Returns:
             List[str]: List of subscribed topics.
         """
-        return list(self.data_dict.keys())
+        return self.store.topics()
@@ -0,0 +1,295 @@
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+from .trie import TopicTrie
+
+RULE_TYPES = ('numeric', 'json', 'regex')
+
+class Field(NamedTuple):
+    """Value extracted from a payload."""
+    topic: str
+    value: str
+    # Parsed once at ingest, None if the value is not a number
+    number: Optional[float]
+
+def parse_number(value: Any) -> Optional[float]:
+    # Numeric value of a payload or of a JSON value, None if it is not a number
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+def format_value(value: Any) -> str:
+    # Text of an extracted JSON value, strings are kept as they are
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+def resolve_path(document: Any, path: str) -> Any:
+    """
+    Get a value of a JSON document.
+
+    Args:
+        document (Any): Parsed JSON document.
+        path (str): Keys and list indexes separated by '.', optionally starting with '$.', e.g. 'rooms.0.temp'.
+
+    Returns:
+        Any: The value.
+
+    Raises:
+        KeyError: If the path does not exist in the document.
+    """
+    if path.startswith('$.'):
+        path = path[2:]
+    for key in path.split('.'):
+        if isinstance(document, dict) and key in document:
+            document = document[key]
+        elif isinstance(document, list) and key.lstrip('-').isdigit() and -len(document) <= int(key) < len(document):
+            document = document[int(key)]
+        else:
+            raise KeyError(key)
+    return document
+
+class Rule:
+    """
+    How the payloads of the topics matching a filter are parsed.
+
+    - numeric: the payload must be a number, other payloads are dropped.
+    - json: each field is read from the JSON payload by its path and stored as the
+      virtual topic '<topic>/<field>', fields missing from a payload are skipped.
+      Without fields, every top-level key that is not an object or a list becomes a field.
+    - regex: each named group of the pattern is stored as the virtual topic
+      '<topic>/<group>'. A pattern without named groups replaces the payload by its
+      first group, or by the whole match if it has none.
+
+    Payloads of json and regex rules are stored on the topic itself too, unless they
+    are replaced by the match.
+    """
+    def __init__(self, topic_filter: str, rule_type: str, fields: Optional[Dict[str, str]] = None,
+                 pattern: Optional[str] = None):
+        """
+        Initialize the rule.
+
+        Args:
+            topic_filter (str): Topic filter of the parsed topics, may contain '+' and '#' wildcards.
+            rule_type (str): 'numeric', 'json' or 'regex'.
+            fields (Optional[Dict[str, str]]): JSON path of each field for json rules.
+            pattern (Optional[str]): Regular expression searched in the payload for regex rules.
+
+        Raises:
+            ValueError: If the type is unknown, a field name contains '/', or the pattern
+                        is missing or invalid for a regex rule.
+        """
+        if rule_type not in RULE_TYPES:
+            raise ValueError(f'Unknown payload rule type "{rule_type}", choose from {", ".join(RULE_TYPES)}')
+        for field in fields or {}:
+            if not field or '/' in field:
+                raise ValueError(f'Invalid field name "{field}" for "{topic_filter}": it must be one topic level')
+        self.topic_filter: str = topic_filter
+        self.rule_type: str = rule_type
+        self.fields: Dict[str, str] = dict(fields or {})
+        self.pattern: Optional[Pattern] = None
+        if rule_type == 'regex':
+            if not pattern:
+                raise ValueError(f'Payload rule "{topic_filter}" of type regex needs a pattern')
+            try:
+                self.pattern = re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f'Invalid pattern of payload rule "{topic_filter}": {e}') from e
+
+    @classmethod
+    def from_dict(cls, rule: Dict[str, Any]) -> 'Rule':
+        """
+        Build a rule from its configuration.
+
+        Args:
+            rule (Dict[str, Any]): Object with "filter", "type" and, depending on the type,
+                                   "fields" or "pattern".
+
+        Returns:
+            Rule: The rule.
+
+        Raises:
+            ValueError: If the configuration is invalid.
+        """
+        if not isinstance(rule, dict) or 'filter' not in rule or 'type' not in rule:
+            raise ValueError(f'Payload rule {rule!r} must be an object with "filter" and "type"')
+        return cls(rule['filter'], rule['type'], rule.get('fields', None), rule.get('pattern', None))
+
+    def extracts(self, field: str) -> bool:
+        """
+        Check whether the rule may store a field of the parsed topics.
+
+        Args:
+            field (str): Last level of a topic.
+
+        Returns:
+            bool: True if '<topic>/<field>' is one of the fields of the rule, any field
+                  for json rules without configured fields.
+        """
+        if self.rule_type == 'json':
+            return field in self.fields if self.fields else True
+        if self.rule_type == 'regex':
+            return field in self.pattern.groupindex
+        return False
+
+    def parse(self, topic: str, payload: str) -> List[Field]:
+        """
+        Parse a payload.
+
+        Args:
+            topic (str): Topic the payload was received on.
+            payload (str): The decoded payload.
+
+        Returns:
+            List[Field]: Values to store, empty if the payload has to be dropped.
+
+        Raises:
+            ValueError: If the payload does not match the rule.
+        """
+        if self.rule_type == 'numeric':
+            number = parse_number(payload)
+            if number is None:
+                raise ValueError('payload is not a number')
+            return [Field(topic, payload.strip(), number)]
+        if self.rule_type == 'json':
+            document = json.loads(payload)
+            fields: List[Field] = [Field(topic, payload, None)]
+            if self.fields:
+                items: List[Tuple[str, Any]] = []
+                for field, path in self.fields.items():
+                    try:
+                        items.append((field, resolve_path(document, path)))
+                    except KeyError:
+                        # Optional fields may be left out by the device
+                        continue
+            elif isinstance(document, dict):
+                items = [(str(key), value) for key, value in document.items()
+                         if not isinstance(value, (dict, list)) and '/' not in str(key)]
+            else:
+                raise ValueError('payload is not a JSON object')
+            for field, value in items:
+                fields.append(Field(f'{topic}/{field}', format_value(value), parse_number(value)))
+            return fields
+        match = self.pattern.search(payload)
+        if match is None:
+            raise ValueError('pattern does not match')
+        groups = match.groupdict()
+        if not groups:
+            value = match.group(1) if self.pattern.groups else match.group(0)
+            return [Field(topic, value, parse_number(value))]
+        fields = [Field(topic, payload, parse_number(payload))]
+        for group, value in groups.items():
+            if value is not None:
+                fields.append(Field(f'{topic}/{group}', value, parse_number(value)))
+        return fields
+
+class PayloadParser:
+    """
+    Turns received payloads into typed values, once at ingest.
+
+    Topics are parsed by the first configured rule whose filter matches them. Topics
+    without a rule keep their payload as it is, with its numeric value if it has one.
+
+    A stored topic belongs to whatever stored it first, a message received on it or the
+    topic a field was extracted from, and values from the other are dropped so the two
+    never overwrite each other. A message received on a topic matching a rule always
+    takes the topic over, such topics are never fields.
+    """
+    def __init__(self, rules: Iterable[Dict[str, Any]] = ()):
+        """
+        Initialize the parser.
+
+        Args:
+            rules (Iterable[Dict[str, Any]]): Configuration of each rule, in order.
+
+        Raises:
+            ValueError: If a rule or its topic filter is invalid.
+        """
+        self.rules: Dict[str, Rule] = {}
+        for rule in rules:
+            rule = Rule.from_dict(rule)
+            self.rules.setdefault(rule.topic_filter, rule)
+        self.trie: TopicTrie = TopicTrie(self.rules)
+        self.order: Dict[str, int] = {topic_filter: i for i, topic_filter in enumerate(self.rules)}
+        # Rule of each received topic, None for the topics without one
+        self.topic_rules: Dict[str, Optional[Rule]] = {}
+        # Number of payloads that did not match their rule
+        self.errors: int = 0
+        # Topic each stored topic was received on: itself, or the parent of a field
+        self.owners: Dict[str, str] = {}
+        # Stored topics written both by messages and as a field, warned about once
+        self.collisions: Set[str] = set()
+
+    def rule_of(self, topic: str) -> Optional[Rule]:
+        """
+        Get the rule parsing a topic.
+
+        Args:
+            topic (str): Topic name without wildcards.
+
+        Returns:
+            Optional[Rule]: The first configured rule whose filter matches the topic, None if none does.
+        """
+        try:
+            return self.topic_rules[topic]
+        except KeyError:
+            pass
+        topic_filters = self.trie.find(topic) if self.rules else []
+        rule = self.rules[min(topic_filters, key=self.order.__getitem__)] if topic_filters else None
+        self.topic_rules[topic] = rule
+        return rule
+
+    def claim(self, field: Field, topic: str) -> bool:
+        """
+        Check whether a value parsed from a message may be stored.
+
+        Args:
+            field (Field): The value.
+            topic (str): Topic the message was received on.
+
+        Returns:
+            bool: False if the topic of the value is already stored from another topic.
+        """
+        owner = self.owners.setdefault(field.topic, topic)
+        if owner == topic:
+            return True
+        if field.topic == topic and self.rule_of(topic) is not None:
+            # Topics matching a rule are never fields
+            self.owners[topic] = topic
+            return True
+        if field.topic not in self.collisions:
+            self.collisions.add(field.topic)
+            if field.topic == topic:
+                logging.warning(f'Messages on {topic} are dropped, the topic is a field extracted from {owner}')
+            else:
+                logging.warning(f'Field {field.topic} extracted from {topic} is dropped, messages are received on the topic')
+        return False
+
+    def parse(self, topic: str, payload: str) -> List[Field]:
+        """
+        Parse a payload.
+
+        Args:
+            topic (str): Topic the payload was received on.
+            payload (str): The decoded payload.
+
+        Returns:
+            List[Field]: Values to store, empty if the payload does not match its rule.
+                         Values whose topic is stored from another topic are left out.
+        """
+        rule = self.rule_of(topic)
+        if rule is None:
+            fields = [Field(topic, payload, parse_number(payload))]
+        else:
+            try:
+                fields = rule.parse(topic, payload)
+            except (ValueError, KeyError) as e:
+                self.errors += 1
+                logging.debug(f'Payload of {topic} dropped by the {rule.rule_type} rule "{rule.topic_filter}": {e}')
+                return []
+        return [field for field in fields if self.claim(field, topic)]
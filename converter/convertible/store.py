@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+class Reading(NamedTuple):
+    """Latest value of a topic."""
+    value: str
+    timestamp: float
+    sequence: int
+    # Store version at which the value last changed
+    version: int
+    # Number of messages received on the topic
+    count: int
+    # Value parsed once at ingest, None if it is not a number
+    number: Optional[float] = None
+
+class TopicStore:
+    """
+    Latest reading of every topic.
+
+    Written by the client network thread and read from the server event loop.
+    Readings are immutable, so a lookup never sees a half-written value.
+
+    The store version is bumped whenever a topic is added or its value changes,
+    and readings are kept ordered by the version of their last change, so the
+    changes since a version are found without scanning unchanged topics.
+    """
+    def __init__(self):
+        """Initialize an empty store."""
+        self.lock: threading.Lock = threading.Lock()
+        self.readings: Dict[str, Reading] = {}
+        # Sequence number of the last stored reading, shared by all topics
+        self.sequence: int = 0
+        # Number of topic additions and value changes so far
+        self.version: int = 0
+
+    def set(self, topic: str, value: str, timestamp: Optional[float] = None,
+            number: Optional[float] = None) -> Reading:
+        """
+        Store the latest value of a topic.
+
+        Args:
+            topic (str): The topic.
+            value (str): The received value.
+            timestamp (Optional[float]): Receive time, time.time() if None.
+            number (Optional[float]): Numeric value, None if the value is not a number.
+
+        Returns:
+            Reading: The stored reading.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            self.sequence += 1
+            previous = self.readings.get(topic, None)
+            if previous is not None and previous.value == value:
+                reading = Reading(value, timestamp, self.sequence, previous.version, previous.count + 1, number)
+            else:
+                self.version += 1
+                count = previous.count + 1 if previous is not None else 1
+                reading = Reading(value, timestamp, self.sequence, self.version, count, number)
+                # Move the topic to the end to keep the readings ordered by version
+                self.readings.pop(topic, None)
+            self.readings[topic] = reading
+        return reading
+
+    def get(self, topic: str) -> Optional[Reading]:
+        """
+        Get the latest reading of a topic.
+
+        Args:
+            topic (str): The topic.
+
+        Returns:
+            Optional[Reading]: Latest reading, or None if topic not found.
+        """
+        # A single dict lookup is atomic, no lock needed
+        return self.readings.get(topic, None)
+
+    def topics(self) -> List[str]:
+        """
+        Get the list of topics with a reading.
+
+        Returns:
+            List[str]: List of topics.
+        """
+        with self.lock:
+            return list(self.readings.keys())
+
+    def snapshot(self) -> Tuple[int, Dict[str, str]]:
+        """
+        Get the value of every topic.
+
+        Returns:
+            Tuple[int, Dict[str, str]]: Store version and value of each topic.
+        """
+        with self.lock:
+            return self.version, {topic: reading.value for topic, reading in self.readings.items()}
+
+    def changes(self, since: int) -> Tuple[int, Dict[str, str]]:
+        """
+        Get the topics added or changed after a version.
+
+        Args:
+            since (int): Version the caller is up to date with.
+
+        Returns:
+            Tuple[int, Dict[str, str]]: Store version and value of each changed topic.
+        """
+        values: Dict[str, str] = {}
+        with self.lock:
+            for topic, reading in reversed(self.readings.items()):
+                if reading.version <= since:
+                    break
+                values[topic] = reading.value
+            return self.version, values
+
+    def get_all(self) -> Dict[str, Reading]:
+        """
+        Get the latest reading of every topic.
+
+        Returns:
+            Dict[str, Reading]: Latest reading by topic.
+        """
+        with self.lock:
+            return dict(self.readings)
+
+    def __contains__(self, topic: str) -> bool:
+        return topic in self.readings
+
+    def __len__(self) -> int:
+        return len(self.readings)
@@ -0,0 +1,159 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+
+SINGLE_LEVEL = '+'
+MULTI_LEVEL = '#'
+
+def validate_filter(topic_filter: str) -> None:
+    """
+    Check that a topic filter follows the MQTT wildcard rules.
+
+    Args:
+        topic_filter (str): Topic filter, levels separated by '/'.
+
+    Raises:
+        ValueError: If a wildcard does not take a whole level or '#' is not the last level.
+    """
+    if not topic_filter:
+        raise ValueError('Topic filter must not be empty')
+    levels = topic_filter.split('/')
+    for i, level in enumerate(levels):
+        if level in (SINGLE_LEVEL, MULTI_LEVEL):
+            if level == MULTI_LEVEL and i != len(levels) - 1:
+                raise ValueError(f'Invalid topic filter "{topic_filter}": "#" must be the last level')
+        elif SINGLE_LEVEL in level or MULTI_LEVEL in level:
+            raise ValueError(f'Invalid topic filter "{topic_filter}": wildcards must take a whole level')
+
+class _Node:
+    __slots__ = ('children', 'filter')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        # Filter ending at this node
+        self.filter: Optional[str] = None
+
+class TopicTrie:
+    """
+    Set of MQTT topic filters matched level by level.
+
+    Matching a topic walks at most the literal, '+' and '#' branches of each of its
+    levels, so the time depends on the depth of the topic and not on the number of filters.
+    """
+    def __init__(self, topic_filters: Iterable[str] = ()):
+        """
+        Initialize the trie.
+
+        Args:
+            topic_filters (Iterable[str]): Topic filters to add.
+
+        Raises:
+            ValueError: If a topic filter is invalid.
+        """
+        self.root: _Node = _Node()
+        self.filters: List[str] = []
+        for topic_filter in topic_filters:
+            self.add(topic_filter)
+
+    def add(self, topic_filter: str) -> None:
+        """
+        Add a topic filter.
+
+        Args:
+            topic_filter (str): Topic filter, may contain '+' and '#' wildcards.
+
+        Raises:
+            ValueError: If the topic filter is invalid.
+        """
+        validate_filter(topic_filter)
+        node = self.root
+        for level in topic_filter.split('/'):
+            node = node.children.setdefault(level, _Node())
+        if node.filter is None:
+            node.filter = topic_filter
+            self.filters.append(topic_filter)
+
+    def match(self, topic: str) -> bool:
+        """
+        Check whether a topic matches any of the filters.
+
+        Args:
+            topic (str): Topic name without wildcards.
+
+        Returns:
+            bool: True if at least one filter matches the topic.
+        """
+        return next(self._walk(topic, first=True), None) is not None
+
+    def find(self, topic: str) -> List[str]:
+        """
+        Find all filters matching a topic.
+
+        Args:
+            topic (str): Topic name without wildcards.
+
+        Returns:
+            List[str]: Matching topic filters, in no particular order.
+        """
+        return list(self._walk(topic))
+
+    def _walk(self, topic: str, first: bool = False) -> Iterator[str]:
+        levels = topic.split('/')
+        # Wildcards in the first level do not match system topics starting with '$'
+        system = topic.startswith('$')
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            wildcards = not (system and depth == 0)
+            # '#' also matches the parent level itself, 'sport/#' matches 'sport'
+            if wildcards and MULTI_LEVEL in node.children:
+                yield node.children[MULTI_LEVEL].filter
+                if first:
+                    return
+            if depth == len(levels):
+                if node.filter is not None:
+                    yield node.filter
+                continue
+            child = node.children.get(levels[depth], None)
+            if child is not None:
+                stack.append((child, depth + 1))
+            if wildcards:
+                child = node.children.get(SINGLE_LEVEL, None)
+                if child is not None:
+                    stack.append((child, depth + 1))
+
+    def __bool__(self) -> bool:
+        return bool(self.filters)
+
+    def __len__(self) -> int:
+        return len(self.filters)
+
+class TopicFilter:
+    """
+    Decides which received topics are kept.
+
+    A topic is kept if it matches one of the include filters and none of the exclude filters.
+    """
+    def __init__(self, include: Iterable[str], exclude: Iterable[str] = ()):
+        """
+        Initialize the filter.
+
+        Args:
+            include (Iterable[str]): Topic filters of the topics to keep.
+            exclude (Iterable[str]): Topic filters of the topics to drop even if included.
+
+        Raises:
+            ValueError: If a topic filter is invalid.
+        """
+        self.include: TopicTrie = TopicTrie(include)
+        self.exclude: TopicTrie = TopicTrie(exclude)
+
+    def match(self, topic: str) -> bool:
+        """
+        Check whether a topic is kept.
+
+        Args:
+            topic (str): Topic name without wildcards.
+
+        Returns:
+            bool: True if the topic is included and not excluded.
+        """
+        return self.include.match(topic) and not (self.exclude and self.exclude.match(topic))
@@ -1,4 +1,5 @@
 from environs import Env
+from marshmallow.validate import Range
 
 env = Env()
 env.read_env()
@@ -9,4 +10,16 @@ MQTT_ADDRESS: str = env.str('MQTT_ADDRESS')
 MQTT_PORT: int = env.int('MQTT_PORT')
 MQTT_USERNAME: str = env.str('MQTT_USERNAME')
 MQTT_PASSWORD: str = env.str('MQTT_PASSWORD')
-MQTT_TOPICS: list = env.str('MQTT_TOPICS').split(', ')
\ No newline at end of file
+MQTT_TOPICS: list = env.str('MQTT_TOPICS').split(', ')
+MQTT_INCLUDE_TOPICS: list = env.str('MQTT_INCLUDE_TOPICS', '').split(', ') if env.str('MQTT_INCLUDE_TOPICS', '') else []
+MQTT_EXCLUDE_TOPICS: list = env.str('MQTT_EXCLUDE_TOPICS', '').split(', ') if env.str('MQTT_EXCLUDE_TOPICS', '') else []
+# Payload parsing rules by topic filter, a JSON list of {"filter", "type", "fields" or "pattern"} objects
+PAYLOAD_RULES: list = env.json('PAYLOAD_RULES', '[]')
+
+# Numeric samples kept per topic for /history, 0 to keep none
+HISTORY_SIZE: int = env.int('HISTORY_SIZE', 256, validate=Range(min=0))
+
+# Number of worker processes sharing the subscriptions, 1 to run in a single process
+CONVERTER_WORKERS: int = env.int('CONVERTER_WORKERS', 1)
+# Workers listen on 127.0.0.1 from this port on
+CONVERTER_WORKER_PORT: int = env.int('CONVERTER_WORKER_PORT', SERVER_PORT + 1)
@@ -0,0 +1,57 @@
+import time
+from typing import Iterator
+
+from aiohttp import web
+from prometheus_client import Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+
+HTTP_REQUEST_DURATION = Histogram('converter_http_request_duration_seconds',
+                                  'Duration of HTTP requests by route', ['route'])
+
+class ClientCollector:
+    """
+    Exposes the topics of a converter client when scraped.
+
+    Nothing is recorded per message, the counts and timestamps are read from the
+    latest readings, so the metrics cost nothing on the ingest path.
+    """
+    def __init__(self, client):
+        """
+        Initialize the collector.
+
+        Args:
+            client: Converter client, e.g. Mqtt.
+        """
+        self.client = client
+
+    def collect(self) -> Iterator[Metric]:
+        now = time.time()
+        readings = self.client.get_readings()
+        messages = CounterMetricFamily('converter_messages', 'Messages received by topic', labels=['topic'])
+        age = GaugeMetricFamily('converter_value_age_seconds', 'Time since the last value of each topic',
+                                labels=['topic'])
+        for topic, reading in readings.items():
+            messages.add_metric([topic], reading.count)
+            age.add_metric([topic], now - reading.timestamp)
+        yield messages
+        yield age
+        yield GaugeMetricFamily('converter_topics', 'Number of stored topics', value=len(readings))
+        yield GaugeMetricFamily('converter_store_version', 'Number of topic additions and value changes',
+                                value=self.client.get_version())
+        yield CounterMetricFamily('converter_messages_dropped', 'Messages dropped by the topic filters',
+                                  value=self.client.dropped)
+        yield CounterMetricFamily('converter_payloads_unparsable', 'Payloads dropped by their parsing rule',
+                                  value=self.client.parser.errors)
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    # Times every request except the long-lived value streams
+    if request.path == '/stream':
+        return await handler(request)
+    start_time = time.perf_counter()
+    try:
+        return await handler(request)
+    finally:
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else 'unmatched'
+        HTTP_REQUEST_DURATION.labels(route).observe(time.perf_counter() - start_time)
@@ -1,18 +1,233 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
 import requests
 import aiohttp
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_KEEPALIVE_TIMEOUT = 30.0
+# The converter sends a keep-alive comment every 15 seconds on /stream
+STREAM_READ_TIMEOUT = 60.0
+
+# Shared keep-alive session for the synchronous helpers
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=DEFAULT_POOL_SIZE))
+
+def list_topics(host, port, timeout=DEFAULT_TIMEOUT):
+    return _session.get(f'http://{host}:{port}/list_topics', timeout=timeout).text
+
+def get_value(host, port, topic, timeout=DEFAULT_TIMEOUT):
+    return _session.get(f'http://{host}:{port}/get_value', params={'topic': topic}, timeout=timeout).text
+
+def get_values(host, port, topics, timeout=DEFAULT_TIMEOUT):
+    return _session.post(f'http://{host}:{port}/get_values', json={'topics': list(topics)}, timeout=timeout).json()
+
+def get_history(host, port, topic, since=0, max_points=100, timeout=DEFAULT_TIMEOUT):
+    params = {'topic': topic, 'since': since, 'max_points': max_points}
+    response = _session.get(f'http://{host}:{port}/history', params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()['points']
+
+class ConverterClient:
+    """
+    Long-lived asynchronous client for the converter HTTP interface.
+
+    The underlying aiohttp session is created lazily inside the running event loop
+    and reused for every request, so connections are pooled and kept alive.
+    """
+    def __init__(self, host: str, port: int, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_TIMEOUT, keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+                 trace_configs: Optional[List[aiohttp.TraceConfig]] = None):
+        """
+        Initialize converter client.
+
+        Args:
+            host (str): Converter address.
+            port (int): Converter port.
+            pool_size (int): Maximum number of simultaneous connections.
+            timeout (float): Default total timeout of a request in seconds.
+            keepalive_timeout (float): How long an idle connection is kept open in seconds.
+            trace_configs (Optional[List[aiohttp.TraceConfig]]): Hooks called around every request.
+        """
+        self.host: str = host
+        self.port: int = port
+        self.pool_size: int = pool_size
+        self.timeout: float = timeout
+        self.keepalive_timeout: float = keepalive_timeout
+        self.trace_configs: Optional[List[aiohttp.TraceConfig]] = trace_configs
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size,
+                                             keepalive_timeout=self.keepalive_timeout,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(base_url=f'http://{self.host}:{self.port}',
+                                                  connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                                  trace_configs=self.trace_configs)
+        return self._session
+
+    @staticmethod
+    def _options(timeout: Optional[float]) -> Dict[str, Any]:
+        # Leave the session default timeout alone unless overridden per request
+        if timeout is None:
+            return {}
+        return {'timeout': aiohttp.ClientTimeout(total=timeout)}
+
+    async def list_topics(self, timeout: Optional[float] = None) -> str:
+        """
+        Get the comma-separated list of topics.
+
+        Args:
+            timeout (Optional[float]): Timeout of this request, the client default if None.
+        """
+        async with self.session.get('/list_topics', **self._options(timeout)) as response:
+            return await response.text()
+
+    async def get_value(self, topic: str, timeout: Optional[float] = None) -> str:
+        """
+        Get the value of a topic.
+
+        Args:
+            topic (str): Topic for which to retrieve the value.
+            timeout (Optional[float]): Timeout of this request, the client default if None.
+        """
+        async with self.session.get('/get_value', params={'topic': topic},
+                                    **self._options(timeout)) as response:
+            return await response.text()
+
+    async def get_values(self, topics: Iterable[str], timeout: Optional[float] = None,
+                         batch_size: Optional[int] = None) -> Dict[str, Optional[str]]:
+        """
+        Get the values of several topics in one request, or in concurrent batches.
+
+        Args:
+            topics (Iterable[str]): Topics for which to retrieve the values.
+            timeout (Optional[float]): Timeout of each request, the client default if None.
+            batch_size (Optional[int]): Maximum number of topics per request, all in one request if None.
+                                        At most `pool_size` batches are requested at the same time.
+
+        Returns:
+            Dict[str, Optional[str]]: Value of each topic, None if topic not found.
+
+        Raises:
+            ValueError: If the batch size is lower than 1.
+        """
+        if batch_size is not None and batch_size < 1:
+            raise ValueError(f'Batch size must be at least 1, got {batch_size}')
+        topics = list(topics)
+        if batch_size is None or len(topics) <= batch_size:
+            return await self._get_values(topics, timeout)
+        batches = [topics[start:start + batch_size] for start in range(0, len(topics), batch_size)]
+        semaphore = asyncio.Semaphore(self.pool_size)
+
+        async def get_batch(batch: List[str]) -> Dict[str, Optional[str]]:
+            # Wait for a free connection before the request timeout starts
+            async with semaphore:
+                return await self._get_values(batch, timeout)
+
+        values: Dict[str, Optional[str]] = {}
+        for batch_values in await asyncio.gather(*(get_batch(batch) for batch in batches)):
+            values.update(batch_values)
+        return values
+
+    async def _get_values(self, topics: List[str], timeout: Optional[float]) -> Dict[str, Optional[str]]:
+        async with self.session.post('/get_values', json={'topics': topics},
+                                     **self._options(timeout)) as response:
+            return await response.json()
+
+    async def get_snapshot(self, etag: Optional[str] = None,
+                           timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the value of every topic.
+
+        Args:
+            etag (Optional[str]): ETag of the last snapshot, to skip the download if nothing changed.
+            timeout (Optional[float]): Timeout of this request, the client default if None.
+
+        Returns:
+            Optional[Dict[str, Any]]: Snapshot with version, values and etag keys,
+                                      or None if the given ETag is still current.
+        """
+        headers = {'If-None-Match': etag} if etag else {}
+        async with self.session.get('/snapshot', headers=headers, **self._options(timeout)) as response:
+            if response.status == 304:
+                return None
+            response.raise_for_status()
+            snapshot = await response.json()
+            snapshot['etag'] = response.headers.get('ETag', None)
+            return snapshot
+
+    async def get_changes(self, since: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get the topics added or changed after a version.
+
+        Args:
+            since (str): Version returned by a previous snapshot, changes request or stream event.
+            timeout (Optional[float]): Timeout of this request, the client default if None.
+
+        Returns:
+            Dict[str, Any]: Changes with version, values and full keys. When full is set the
+                            version was unknown to the converter and values holds every topic.
+        """
+        async with self.session.get('/changes', params={'since': since},
+                                    **self._options(timeout)) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def get_history(self, topic: str, since: float = 0, max_points: int = 100,
+                          timeout: Optional[float] = None) -> List[Dict[str, float]]:
+        """
+        Get the downsampled history of a topic.
+
+        Args:
+            topic (str): Topic for which to retrieve the history.
+            since (float): Only samples received at or after this time are used.
+            max_points (int): Maximum number of points returned.
+            timeout (Optional[float]): Timeout of this request, the client default if None.
+
+        Returns:
+            List[Dict[str, float]]: Start timestamp, min, max, avg and count of each point.
+
+        Raises:
+            aiohttp.ClientResponseError: If the topic has no history.
+        """
+        params = {'topic': topic, 'since': since, 'max_points': max_points}
+        async with self.session.get('/history', params=params, **self._options(timeout)) as response:
+            response.raise_for_status()
+            return (await response.json())['points']
+
+    async def stream(self, since: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Subscribe to the value stream of the converter.
 
-def list_topics(host, port):
-    return requests.get(f'http://{host}:{port}/list_topics').text
+        Args:
+            since (Optional[str]): Version returned by get_snapshot, get_changes or a previous event,
+                                   the values changed after it are sent first so none is missed
+                                   between the sync and the subscription.
 
-def get_value(host, port, topic):
-    return requests.get(f'http://{host}:{port}/get_value?topic={topic}').text
+        Yields:
+            Dict[str, Any]: Events with topic, value, timestamp and version keys.
 
-async def list_topics_async(host, port):
-    async with aiohttp.ClientSession() as session:
-        response = await session.get(f'http://{host}:{port}/list_topics')
-        return await response.text()
+        Raises:
+            aiohttp.ClientError: If the stream cannot be opened or is interrupted.
+        """
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=STREAM_READ_TIMEOUT)
+        params = {'since': since} if since is not None else None
+        async with self.session.get('/stream', params=params, timeout=timeout) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                if line.startswith(b'data:'):
+                    yield json.loads(line[len(b'data:'):])
 
-async def get_value_async(host, port, topic):
-    async with aiohttp.ClientSession() as session:
-        response = await session.get(f'http://{host}:{port}/get_value?topic={topic}')
-        return await response.text()
+    async def close(self) -> None:
+        """Close the session and all pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Gauge, generate_latest
+
+from .convertible.store import Reading
+from .metrics import ClientCollector, metrics_middleware
+
+# Events buffered per /stream subscriber before it is considered too slow and dropped
+STREAM_QUEUE_SIZE = 1000
+# Seconds without events after which a keep-alive comment is sent to /stream subscribers
+STREAM_HEARTBEAT = 15
+# Points returned by /history when max_points is not given, and the most it may ask for
+HISTORY_DEFAULT_POINTS = 100
+HISTORY_MAX_POINTS = 1000
+
+STREAM_SUBSCRIBERS = Gauge('converter_stream_subscribers', 'Number of connected /stream subscribers')
+
+class HttpConverter:
+    def __init__(self, host, port, client):
+        self.host = host
+        self.port = port
+        # So we can pass any client not only mqtt
+        self.client = client
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.subscribers: Set[asyncio.Queue] = set()
+        # Versions restart from zero with the process, the epoch tells the runs apart
+        self.epoch: str = uuid.uuid4().hex[:8]
+
+    def version_token(self, version: int) -> str:
+        # Opaque version handed out to clients
+        return f'{self.epoch}-{version}'
+
+    def parse_version_token(self, token: str) -> Optional[int]:
+        # Version of a token, None if it was handed out by a previous run
+        epoch, _, version = token.partition('-')
+        if not version.isdigit():
+            raise ValueError(f'Invalid version "{token}"')
+        return int(version) if epoch == self.epoch else None
+
+    def on_value(self, topic: str, reading: Reading, version: int) -> None:
+        # Called from the client thread, hand the event over to the server loop
+        if self.loop is not None and self.subscribers:
+            event = {'topic': topic, 'value': reading.value, 'timestamp': reading.timestamp,
+                     'version': self.version_token(version)}
+            self.loop.call_soon_threadsafe(self.publish, event, 0, version)
+
+    def publish(self, event: Dict[str, Any], source: int, version: int) -> None:
+        # The source and its version tell a subscriber which events its backlog already contains
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait((source, version, event))
+            except asyncio.QueueFull:
+                # Slow subscriber, close its stream so it reconnects and resyncs
+                logging.warning('Stream subscriber is too slow, dropping it')
+                self.close_subscriber(queue)
+
+    @staticmethod
+    def close_subscriber(queue: asyncio.Queue) -> None:
+        # Discard the pending events and end the stream
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    @staticmethod
+    async def read_topics(request) -> Optional[List[str]]:
+        # Topics of a batch request, None if the POST body is invalid
+        if request.method == 'POST':
+            try:
+                body = await request.json()
+                return list(body.get('topics', []))
+            except (ValueError, AttributeError, TypeError):
+                return None
+        return request.query.getall('topic', [])
+
+    @staticmethod
+    async def read_typed(request) -> bool:
+        # Whether a batch request asks for numbers instead of text, read after read_topics
+        if request.method == 'POST':
+            return (await request.json()).get('typed', False) is True
+        return request.query.get('typed', '') in ('1', 'true')
+
+    def get_typed_value(self, topic: str) -> Any:
+        # Number parsed at ingest, or the text of a non-numeric value
+        reading = self.client.get_reading(topic)
+        if reading is None:
+            return None
+        return reading.number if reading.number is not None else reading.value
+
+    async def handle_list_topics(self, request):
+        # Handles /list_topics
+        return web.Response(text=','.join(self.client.list_topics()))
+
+    async def handle_get_value(self, request):
+        # Handles /get_value?topic=<topic>
+        topic = request.query.get('topic', None)
+        value = self.client.get_value(topic)
+        if value is not None:
+            return web.Response(text=value)
+        else:
+            return web.Response(text=f'Topic "{topic}" not found', status=404)
+
+    async def handle_get_values(self, request):
+        # Handles /get_values?topic=<topic>&topic=<topic>[&typed=1] and POST /get_values {"topics": [...], "typed": true}
+        topics = await self.read_topics(request)
+        if topics is None:
+            return web.Response(text='Body must be a JSON object with a "topics" list', status=400)
+        if await self.read_typed(request):
+            return web.json_response({topic: self.get_typed_value(topic) for topic in topics})
+        return web.json_response({topic: self.client.get_value(topic) for topic in topics})
+
+    async def handle_snapshot(self, request):
+        # Handles /snapshot, answers 304 if the If-None-Match ETag is still current
+        etag = f'"{self.version_token(self.client.get_version())}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers={'ETag': etag})
+        version, values = self.client.get_snapshot()
+        token = self.version_token(version)
+        return web.json_response({'version': token, 'values': values}, headers={'ETag': f'"{token}"'})
+
+    async def handle_changes(self, request):
+        # Handles /changes?since=<version>, values added or changed after the version,
+        # all values with "full" set if the version is from a previous run
+        try:
+            since = self.parse_version_token(request.query.get('since', ''))
+        except ValueError:
+            return web.Response(text='"since" must be a version returned by /snapshot or /changes', status=400)
+        if since is None:
+            version, values = self.client.get_snapshot()
+        else:
+            version, values = self.client.get_changes(since)
+        return web.json_response({'version': self.version_token(version), 'values': values, 'full': since is None})
+
+    async def handle_history(self, request):
+        # Handles /history?topic=<topic>&since=<timestamp>&max_points=<count>
+        topic = request.query.get('topic', None)
+        try:
+            since = float(request.query.get('since', 0))
+            max_points = min(int(request.query.get('max_points', HISTORY_DEFAULT_POINTS)), HISTORY_MAX_POINTS)
+        except ValueError:
+            return web.Response(text='"since" must be a timestamp and "max_points" an integer', status=400)
+        points = self.client.get_history(topic, since, max_points)
+        if points is None:
+            return web.Response(text=f'History of topic "{topic}" not found', status=404)
+        return web.json_response({'topic': topic, 'points': points})
+
+    async def replay(self, since: str) -> Tuple[Dict[int, int], List[Dict[str, Any]]]:
+        # Events of the values changed after a version, all values if it is from a previous run,
+        # and the version of each source they are up to date with
+        since_version = self.parse_version_token(since)
+        if since_version is None:
+            version, values = self.client.get_snapshot()
+        else:
+            version, values = self.client.get_changes(since_version)
+        token = self.version_token(version)
+        events = []
+        for topic, value in values.items():
+            reading = self.client.get_reading(topic)
+            events.append({'topic': topic, 'value': value, 'timestamp': reading.timestamp if reading else None,
+                           'version': token})
+        return {0: version}, events
+
+    async def handle_stream(self, request):
+        # Handles /stream[?since=<version>], pushes every received value as a Server-Sent Event,
+        # starting with the values changed after the version
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        # Subscribe before reading the backlog, so the values received meanwhile are not missed
+        self.subscribers.add(queue)
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+        })
+        try:
+            replayed: Dict[int, int] = {}
+            backlog: List[Dict[str, Any]] = []
+            if 'since' in request.query:
+                try:
+                    replayed, backlog = await self.replay(request.query['since'])
+                except ValueError:
+                    return web.Response(text='"since" must be a version returned by /snapshot or /changes', status=400)
+            await response.prepare(request)
+            for event in backlog:
+                await response.write(f'data: {json.dumps(event)}\n\n'.encode('utf-8'))
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    await response.write(b': ping\n\n')
+                    continue
+                if item is None:
+                    break
+                source, version, event = item
+                if version <= replayed.get(source, -1):
+                    # Already sent with the backlog
+                    continue
+                await response.write(f'data: {json.dumps(event)}\n\n'.encode('utf-8'))
+        except ConnectionResetError:
+            pass
+        finally:
+            self.subscribers.discard(queue)
+        return response
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[metrics_middleware])
+        app.router.add_get('/list_topics', self.handle_list_topics)
+        app.router.add_get('/get_value', self.handle_get_value)
+        app.router.add_get('/get_values', self.handle_get_values)
+        app.router.add_post('/get_values', self.handle_get_values)
+        app.router.add_get('/snapshot', self.handle_snapshot)
+        app.router.add_get('/changes', self.handle_changes)
+        app.router.add_get('/history', self.handle_history)
+        app.router.add_get('/stream', self.handle_stream)
+        app.router.add_get('/metrics', self.handle_metrics)
+        return app
+
+    async def handle_metrics(self, request):
+        # Handles /metrics in the Prometheus text format, rendered off the event loop
+        body = await asyncio.get_running_loop().run_in_executor(None, generate_latest)
+        return web.Response(body=body, headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+    async def run(self):
+        # Client loop
+        self.loop = asyncio.get_running_loop()
+        REGISTRY.register(ClientCollector(self.client))
+        STREAM_SUBSCRIBERS.set_function(lambda: len(self.subscribers))
+        self.client.add_listener(self.on_value)
+        self.client.run()
+        # Server init
+        await web._run_app(self.create_app(), host=self.host, port=self.port)
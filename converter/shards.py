@@ -0,0 +1,449 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client.core import Metric
+from prometheus_client.parser import text_string_to_metric_families
+
+from .data import config
+from .convertible.mqtt import Mqtt
+from .convertible.parsing import PayloadParser
+from .convertible.trie import TopicFilter, TopicTrie
+from .server import STREAM_SUBSCRIBERS, HttpConverter
+
+# Seconds between two checks that every worker process is alive
+SUPERVISE_INTERVAL = 5
+# Seconds before reconnecting to the value stream of a worker
+STREAM_RETRY_DELAY = 1
+# Workers send a keep-alive comment every 15 seconds on /stream
+STREAM_READ_TIMEOUT = 60
+# Timeout of a request from the front process to a worker in seconds
+WORKER_TIMEOUT = 10
+
+class ShardMap:
+    """
+    Assignment of topic filters and topics to shards.
+
+    Filters are spread over the shards by the CRC32 of the filter. A topic belongs to
+    the shard of the first configured filter matching it, so overlapping filters in
+    different shards never store the same topic twice. Fields extracted from a payload
+    are stored by the shard of the topic they were received on.
+    """
+    def __init__(self, topic_filters: List[str], shards: int, rules: Iterable[Dict[str, Any]] = ()):
+        """
+        Initialize the shard map.
+
+        Args:
+            topic_filters (List[str]): Configured topic filters, in order.
+            shards (int): Number of shards.
+            rules (Iterable[Dict[str, Any]]): Configured payload rules, in order.
+
+        Raises:
+            ValueError: If a topic filter or a payload rule is invalid.
+        """
+        self.shards: int = shards
+        self.trie: TopicTrie = TopicTrie(topic_filters)
+        self.parser: PayloadParser = PayloadParser(rules)
+        # Position of each filter in the configuration
+        self.order: Dict[str, int] = {}
+        for topic_filter in topic_filters:
+            self.order.setdefault(topic_filter, len(self.order))
+
+    def shard_of_filter(self, topic_filter: str) -> int:
+        """
+        Get the shard subscribing to a topic filter.
+
+        Args:
+            topic_filter (str): Configured topic filter.
+
+        Returns:
+            int: Index of the shard.
+        """
+        return zlib.crc32(topic_filter.encode('utf-8')) % self.shards
+
+    def filters_of(self, shard: int) -> List[str]:
+        """
+        Get the topic filters a shard subscribes to.
+
+        Args:
+            shard (int): Index of the shard.
+
+        Returns:
+            List[str]: Topic filters of the shard.
+        """
+        return [topic_filter for topic_filter in self.order if self.shard_of_filter(topic_filter) == shard]
+
+    def shard_of(self, topic: str) -> Optional[int]:
+        """
+        Get the shard storing a topic.
+
+        Args:
+            topic (str): Topic name without wildcards.
+
+        Returns:
+            Optional[int]: Index of the shard receiving the topic, or None if no configured filter matches it.
+        """
+        topic_filters = self.trie.find(topic)
+        if not topic_filters:
+            return None
+        return self.shard_of_filter(min(topic_filters, key=self.order.__getitem__))
+
+    def shards_of(self, topic: str) -> List[int]:
+        """
+        Get the shards that may store a topic, most likely first.
+
+        Args:
+            topic (str): Topic name without wildcards.
+
+        Returns:
+            List[int]: The shard receiving the topic and, if the payload rule of its parent
+                       topic may extract it, the shard of the parent. Topics without a rule
+                       of their own are looked up as fields first.
+        """
+        shards: List[int] = []
+        parent, _, field = topic.rpartition('/')
+        rule = self.parser.rule_of(parent) if parent else None
+        if rule is not None and rule.extracts(field):
+            shards.append(self.shard_of(parent))
+        own = self.shard_of(topic)
+        if self.parser.rule_of(topic) is None:
+            shards.append(own)
+        else:
+            shards.insert(0, own)
+        return list(dict.fromkeys(shard for shard in shards if shard is not None))
+
+class ShardFilter:
+    """Keeps the topics accepted by a topic filter that belong to one shard."""
+    def __init__(self, topic_filter: TopicFilter, shard_map: ShardMap, shard: int):
+        """
+        Initialize the filter.
+
+        Args:
+            topic_filter (TopicFilter): Include and exclude filters of the converter.
+            shard_map (ShardMap): Assignment of topics to shards.
+            shard (int): Index of the shard of this process.
+        """
+        self.topic_filter: TopicFilter = topic_filter
+        self.shard_map: ShardMap = shard_map
+        self.shard: int = shard
+
+    def match(self, topic: str) -> bool:
+        """
+        Check whether a topic is kept by this shard.
+
+        Args:
+            topic (str): Topic name without wildcards.
+
+        Returns:
+            bool: True if the topic is accepted and belongs to this shard.
+        """
+        return self.topic_filter.match(topic) and self.shard_map.shard_of(topic) == self.shard
+
+class _MergedCollector:
+    # Serves metric families collected elsewhere
+    def __init__(self, families: List[Metric]):
+        self.families = families
+
+    def collect(self) -> List[Metric]:
+        return self.families
+
+def run_worker(shard: int, port: int) -> None:
+    # Entry point of a worker process, serves its shard on 127.0.0.1
+    logging.basicConfig(level=logging.INFO, format=f'%(levelname)s:shard {shard}:%(name)s:%(message)s')
+    shard_map = ShardMap(config.MQTT_TOPICS, config.CONVERTER_WORKERS, config.PAYLOAD_RULES)
+    client = Mqtt(config.MQTT_ADDRESS,
+                  config.MQTT_PORT,
+                  config.MQTT_USERNAME,
+                  config.MQTT_PASSWORD,
+                  shard_map.filters_of(shard),
+                  config.HISTORY_SIZE,
+                  config.MQTT_INCLUDE_TOPICS or config.MQTT_TOPICS,
+                  config.MQTT_EXCLUDE_TOPICS,
+                  config.PAYLOAD_RULES)
+    client.filter = ShardFilter(client.filter, shard_map, shard)
+    asyncio.run(HttpConverter('127.0.0.1', port, client).run())
+
+class ShardedConverter(HttpConverter):
+    """
+    Front process of a converter split over several worker processes.
+
+    Every worker runs its own MQTT client and HTTP server for one shard of the
+    subscriptions. The front routes single topic requests to the shard storing the
+    topic, merges the answers of all shards for the others, and republishes their
+    value streams. Versions handed out by the front are the comma-separated
+    versions of all shards.
+    """
+    def __init__(self, host: str, port: int, topic_filters: List[str], workers: int, worker_port: int,
+                 rules: Iterable[Dict[str, Any]] = ()):
+        """
+        Initialize the front process.
+
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on.
+            topic_filters (List[str]): Configured topic filters, in order.
+            workers (int): Number of worker processes.
+            worker_port (int): Port of the first worker, the others use the following ones.
+            rules (Iterable[Dict[str, Any]]): Configured payload rules, in order.
+
+        Raises:
+            ValueError: If a topic filter or a payload rule is invalid.
+        """
+        super().__init__(host, port, None)
+        self.shard_map: ShardMap = ShardMap(topic_filters, workers, rules)
+        self.worker_ports: List[int] = [worker_port + shard for shard in range(workers)]
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        # Last version received from the value stream of each worker, empty until it is followed
+        self.versions: List[str] = [''] * workers
+        # Set while the stream of every worker is followed, so events carry complete version vectors
+        self.followed: asyncio.Event = asyncio.Event()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.tasks: List[asyncio.Task] = []
+
+    def start_worker(self, shard: int) -> None:
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(target=run_worker, args=(shard, self.worker_ports[shard]),
+                                  name=f'converter-shard-{shard}', daemon=True)
+        process.start()
+        self.processes[shard] = process
+        logging.info(f'Started shard {shard} on port {self.worker_ports[shard]} '
+                     f'with filters {self.shard_map.filters_of(shard)}')
+
+    async def supervise(self) -> None:
+        # Restart the workers that died, their versions change so clients resync
+        while True:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            for shard, process in enumerate(self.processes):
+                if process is not None and not process.is_alive():
+                    logging.error(f'Shard {shard} exited with code {process.exitcode}, restarting it')
+                    self.start_worker(shard)
+
+    def url(self, shard: int, path: str) -> str:
+        return f'http://127.0.0.1:{self.worker_ports[shard]}{path}'
+
+    async def fetch(self, shard: int, method: str, path: str, **kwargs) -> Tuple[int, Any]:
+        # Status and body of a worker response, JSON bodies are decoded
+        try:
+            async with self.session.request(method, self.url(shard, path), **kwargs) as response:
+                if response.content_type == 'application/json':
+                    return response.status, await response.json()
+                return response.status, await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f'Shard {shard} is unavailable: {e}')
+            raise web.HTTPBadGateway(text=f'Shard {shard} is unavailable')
+
+    @staticmethod
+    def shard_error(responses: List[Tuple[int, Any]], status: Optional[int] = None) -> Optional[web.Response]:
+        # Answer of the first shard that failed, with its own status unless one is given, None if all succeeded
+        for shard_status, body in responses:
+            if shard_status != 200:
+                return web.Response(text=body if isinstance(body, str) else json.dumps(body),
+                                    status=status or shard_status)
+        return None
+
+    def version_vector(self, versions: List[str]) -> str:
+        return ','.join(versions)
+
+    def split_version_vector(self, token: str) -> List[str]:
+        # Versions of each shard, empty for the shards not known to the token
+        versions = token.split(',') if token else []
+        if len(versions) != len(self.worker_ports):
+            return [''] * len(self.worker_ports)
+        return versions
+
+    async def handle_list_topics(self, request):
+        # Handles /list_topics
+        responses = await asyncio.gather(*(self.fetch(shard, 'GET', '/list_topics')
+                                           for shard in range(len(self.worker_ports))))
+        return web.Response(text=','.join(text for _, text in responses if text))
+
+    async def forward(self, request, topic: Optional[str]):
+        # Passes a single topic request on to the shards that may store the topic, until one has it
+        shards = self.shard_map.shards_of(topic) if topic else []
+        if not shards:
+            return web.Response(text=f'Topic "{topic}" not found', status=404)
+        for shard in shards:
+            status, body = await self.fetch(shard, 'GET', request.path, params=request.query)
+            if status != 404:
+                break
+        if isinstance(body, str):
+            return web.Response(text=body, status=status)
+        return web.json_response(body, status=status)
+
+    async def handle_get_value(self, request):
+        # Handles /get_value?topic=<topic>
+        return await self.forward(request, request.query.get('topic', None))
+
+    async def handle_history(self, request):
+        # Handles /history?topic=<topic>&since=<timestamp>&max_points=<count>
+        return await self.forward(request, request.query.get('topic', None))
+
+    async def handle_get_values(self, request):
+        # Handles /get_values, one request per shard storing any of the topics
+        topics = await self.read_topics(request)
+        if topics is None:
+            return web.Response(text='Body must be a JSON object with a "topics" list', status=400)
+        typed = await self.read_typed(request)
+        values: Dict[str, Any] = {topic: None for topic in topics}
+        candidates = {topic: self.shard_map.shards_of(topic) for topic in values}
+        # The topics not found are asked again from their next candidate shard
+        attempt = 0
+        while True:
+            shard_topics: Dict[int, List[str]] = {}
+            for topic, shards in candidates.items():
+                if values[topic] is None and attempt < len(shards):
+                    shard_topics.setdefault(shards[attempt], []).append(topic)
+            if not shard_topics:
+                break
+            responses = await asyncio.gather(*(self.fetch(shard, 'POST', '/get_values',
+                                                          json={'topics': topics, 'typed': typed})
+                                               for shard, topics in shard_topics.items()))
+            error = self.shard_error(responses, 502)
+            if error is not None:
+                return error
+            for _, shard_values in responses:
+                values.update(shard_values)
+            attempt += 1
+        return web.json_response(values)
+
+    async def handle_snapshot(self, request):
+        # Handles /snapshot, answers 304 if no shard changed since the If-None-Match ETag
+        etag = request.headers.get('If-None-Match', '').strip('"')
+        versions = self.split_version_vector(etag)
+        responses = await asyncio.gather(*(
+            self.fetch(shard, 'GET', '/snapshot', headers={'If-None-Match': f'"{version}"'} if version else {})
+            for shard, version in enumerate(versions)))
+        if all(status == 304 for status, _ in responses):
+            return web.Response(status=304, headers={'ETag': f'"{self.version_vector(versions)}"'})
+        # The shards that did not change still have to send their values
+        responses = [response if response[0] != 304 else await self.fetch(shard, 'GET', '/snapshot')
+                     for shard, response in enumerate(responses)]
+        error = self.shard_error(responses, 502)
+        if error is not None:
+            return error
+        values: Dict[str, str] = {}
+        for status, snapshot in responses:
+            values.update(snapshot['values'])
+        token = self.version_vector([snapshot['version'] for _, snapshot in responses])
+        return web.json_response({'version': token, 'values': values}, headers={'ETag': f'"{token}"'})
+
+    async def fetch_changes(self, versions: List[str]) -> List[Tuple[int, Any]]:
+        # Changes of every shard since its version, a snapshot of the shards without one
+        return await asyncio.gather(*(
+            self.fetch(shard, 'GET', '/changes', params={'since': version}) if version else
+            self.fetch(shard, 'GET', '/snapshot')
+            for shard, version in enumerate(versions)))
+
+    @staticmethod
+    def worker_version(token: str) -> int:
+        # Version of a worker token, without its epoch
+        return int(token.rpartition('-')[2])
+
+    async def handle_changes(self, request):
+        # Handles /changes?since=<version>, a snapshot of the shards missing from the version
+        versions = self.split_version_vector(request.query.get('since', ''))
+        responses = await self.fetch_changes(versions)
+        error = self.shard_error(responses)
+        if error is not None:
+            return error
+        values: Dict[str, str] = {}
+        full = False
+        for version, (_, changes) in zip(versions, responses):
+            values.update(changes['values'])
+            full = full or changes.get('full', not version)
+        token = self.version_vector([changes['version'] for _, changes in responses])
+        return web.json_response({'version': token, 'values': values, 'full': full})
+
+    async def replay(self, since: str) -> Tuple[Dict[int, int], List[Dict[str, Any]]]:
+        # Events of the values changed after a version on every shard, and the worker version
+        # of each shard they are up to date with
+        responses = await self.fetch_changes(self.split_version_vector(since))
+        for shard, (status, body) in enumerate(responses):
+            if status == 400:
+                raise ValueError(body)
+            if status != 200:
+                raise web.HTTPBadGateway(text=f'Shard {shard} answered {status}')
+        token = self.version_vector([changes['version'] for _, changes in responses])
+        replayed = {shard: self.worker_version(changes['version']) for shard, (_, changes) in enumerate(responses)}
+        # The workers do not send the receive times with the changes
+        events = [{'topic': topic, 'value': value, 'timestamp': None, 'version': token}
+                  for _, changes in responses for topic, value in changes['values'].items()]
+        return replayed, events
+
+    async def handle_metrics(self, request):
+        # Handles /metrics, the metrics of the front and of every shard labelled with its index
+        families: Dict[str, Metric] = {family.name: family for family in REGISTRY.collect()}
+        for shard in range(len(self.worker_ports)):
+            try:
+                _, text = await self.fetch(shard, 'GET', '/metrics')
+            except web.HTTPBadGateway:
+                continue
+            for family in text_string_to_metric_families(text):
+                # The parser turns the creation times of the workers into separate gauges
+                if family.name.endswith('_created'):
+                    continue
+                merged = families.get(family.name, None)
+                if merged is None:
+                    merged = families[family.name] = Metric(family.name, family.documentation, family.type, family.unit)
+                for sample in family.samples:
+                    merged.add_sample(sample.name, {**sample.labels, 'shard': str(shard)}, sample.value, sample.timestamp)
+        registry = CollectorRegistry()
+        registry.register(_MergedCollector(list(families.values())))
+        return web.Response(body=generate_latest(registry), headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+    async def follow(self, shard: int) -> None:
+        # Republishes the value stream of a worker with the versions of all shards
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=WORKER_TIMEOUT, sock_read=STREAM_READ_TIMEOUT)
+        while True:
+            try:
+                async with self.session.get(self.url(shard, '/stream'), timeout=timeout) as response:
+                    response.raise_for_status()
+                    # Start from the version of the shard once subscribed, then wait for the other shards
+                    status, snapshot = await self.fetch(shard, 'GET', '/snapshot')
+                    if status != 200:
+                        raise aiohttp.ClientError(f'/snapshot answered {status}')
+                    self.versions[shard] = snapshot['version']
+                    if all(self.versions):
+                        self.followed.set()
+                    async for line in response.content:
+                        if line.startswith(b'data:'):
+                            event = json.loads(line[len(b'data:'):])
+                            # Events received before the snapshot are already included in its version
+                            if self.worker_version(event['version']) > self.worker_version(self.versions[shard]):
+                                self.versions[shard] = event['version']
+                            await self.followed.wait()
+                            event['version'] = self.version_vector(self.versions)
+                            self.publish(event, shard, self.worker_version(self.versions[shard]))
+            except (aiohttp.ClientError, asyncio.TimeoutError, web.HTTPBadGateway) as e:
+                logging.warning(f'Value stream of shard {shard} is interrupted: {e}')
+            self.versions[shard] = ''
+            self.followed.clear()
+            # Events of the shard were missed, make the subscribers reconnect and resync
+            for queue in self.subscribers:
+                self.close_subscriber(queue)
+            await asyncio.sleep(STREAM_RETRY_DELAY)
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        STREAM_SUBSCRIBERS.set_function(lambda: len(self.subscribers))
+        for shard in range(len(self.worker_ports)):
+            self.start_worker(shard)
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=WORKER_TIMEOUT))
+        self.tasks = [asyncio.create_task(self.follow(shard)) for shard in range(len(self.worker_ports))]
+        self.tasks.append(asyncio.create_task(self.supervise()))
+        try:
+            await web._run_app(self.create_app(), host=self.host, port=self.port)
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            await self.session.close()
+            for process in self.processes:
+                if process is not None:
+                    process.terminate()
@@ -0,0 +1,16 @@
+import os
+
+# botmq and the converter read their configuration on import
+for name, value in {
+    'BOT_TOKEN': '123456:test',
+    'SERVER_ADDRESS': '127.0.0.1',
+    'SERVER_PORT': '12345',
+    'SERVER_TIMEOUT': '1',
+    'MQTT_ADDRESS': '127.0.0.1',
+    'MQTT_PORT': '1883',
+    'MQTT_USERNAME': '',
+    'MQTT_PASSWORD': '',
+    'MQTT_TOPICS': '#',
+    'DB_BACKEND': 'memory',
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from botmq.alarms import AlarmTracker
+from botmq.utility.limits import LIMIT_DIRECTIONS, LimitArrays, Subscriber
+
+LIMIT_NAMES = list(LIMIT_DIRECTIONS)
+
+def random_limits(rng, topics: int, users: int):
+    # Small integers, so values often fall exactly on a threshold or a hysteresis bound
+    limits = {}
+    for topic in range(topics):
+        for user_id in range(users):
+            for limit_name in LIMIT_NAMES:
+                threshold = int(rng.integers(0, 10))
+                limits.setdefault(f't{topic}', []).append(Subscriber(user_id, limit_name, threshold, float(threshold)))
+    return limits
+
+@pytest.mark.parametrize('hysteresis', [0.0, 1.0, 2.5])
+@pytest.mark.parametrize('renotify', [False, True])
+@pytest.mark.parametrize('seed', range(5))
+def test_candidates_match_tracker(seed, renotify, hysteresis):
+    rng = np.random.default_rng(seed)
+    arrays = LimitArrays(random_limits(rng, 20, 5))
+    values = rng.integers(0, 10, len(arrays.topic_names)).astype(np.float64)
+    tracker = AlarmTracker(hysteresis, 60.0 if renotify else 0.0)
+    for position in np.flatnonzero(rng.random(len(arrays)) < 0.3).tolist():
+        subscriber = arrays.subscribers[position]
+        tracker.alarms[(subscriber.user_id, arrays.topic(position), subscriber.limit_name)] = 0.0
+    active = arrays.mask(tracker.alarms)
+    positions = np.sort(rng.choice(len(arrays), len(arrays) // 2, replace=False))
+    for selected in (None, positions):
+        candidates = arrays.candidates(values, active, hysteresis, renotify, selected)
+        expected = []
+        for position in (range(len(arrays)) if selected is None else selected.tolist()):
+            subscriber = arrays.subscribers[position]
+            topic = arrays.topic(position)
+            key = (subscriber.user_id, topic, subscriber.limit_name)
+            # A copy, every limit is evaluated from the same state, after the re-notify interval
+            copy = AlarmTracker(hysteresis, tracker.renotify_interval)
+            copy.alarms = {key: tracker.alarms[key]} if key in tracker.alarms else {}
+            value = float(values[arrays.topic_ids[position]])
+            if copy.update(subscriber.user_id, topic, subscriber.limit_name, subscriber.threshold, value, now=100.0):
+                expected.append(position)
+        assert candidates.tolist() == expected
+
+def test_unknown_values_are_never_candidates():
+    arrays = LimitArrays({'t': [Subscriber(1, 'upper_limit', 1, 1.0), Subscriber(1, 'lower_limit', 1, 1.0)]})
+    values = np.array([np.nan])
+    assert arrays.candidates(values, np.zeros(2, np.bool_)).tolist() == []
+    assert arrays.candidates(values, np.ones(2, np.bool_), 0.0, True).tolist() == []
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from botmq.notifier import Notifier
+
+class FakeBot:
+    def __init__(self, retry_after: int = 0):
+        self.retry_after = retry_after
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        # Time the request is made, answering takes a moment
+        sent_at = asyncio.get_running_loop().time()
+        await asyncio.sleep(0.001)
+        if self.retry_after:
+            retry_after, self.retry_after = self.retry_after, 0
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), 'Flood control', retry_after)
+        self.sent.append((sent_at, chat_id, text))
+
+def deliver(bot, messages, **kwargs):
+    async def run():
+        notifier = Notifier(bot, **kwargs)
+        notifier.start()
+        for chat_id, text in messages:
+            notifier.send(chat_id, text)
+        await notifier.stop()
+        return notifier
+    return asyncio.run(run())
+
+def gaps(times):
+    times = sorted(times)
+    return [b - a for a, b in zip(times, times[1:])]
+
+def test_sends_respect_global_and_chat_rates():
+    bot = FakeBot()
+    messages = [(chat_id, str(i)) for i in range(5) for chat_id in (1, 2, 3)]
+    deliver(bot, messages, workers=8, global_rate=50.0, chat_rate=10.0)
+    assert len(bot.sent) == len(messages)
+    assert min(gaps([time for time, _, _ in bot.sent])) >= 0.02 - 0.002
+    for chat_id in (1, 2, 3):
+        assert min(gaps([time for time, chat, _ in bot.sent if chat == chat_id])) >= 0.1 - 0.002
+
+def test_retry_after_holds_every_worker_back():
+    bot = FakeBot(retry_after=1)
+    # The event loop clock is time.monotonic
+    started_at = time.monotonic()
+    notifier = deliver(bot, [(chat_id, 'x') for chat_id in range(4)], workers=4, global_rate=100.0, chat_rate=100.0)
+    assert len(bot.sent) == 4 and notifier.retries == 1
+    assert all(time - started_at >= 1.0 for time, _, _ in bot.sent)
+
+def test_full_queue_drops_messages():
+    async def run():
+        notifier = Notifier(FakeBot(), queue_size=2)
+        for chat_id in range(5):
+            notifier.send(chat_id, 'x')
+        return notifier
+    notifier = asyncio.run(run())
+    assert notifier.queue.qsize() == 2 and notifier.dropped == 3
+    assert notifier.metrics()['dropped'] == 3
@@ -0,0 +1,68 @@
+import logging
+
+from converter.convertible.parsing import Field, PayloadParser
+from converter.shards import ShardMap
+
+def topics(fields):
+    return [field.topic for field in fields]
+
+def test_json_hash_filter_without_fields_keeps_every_device():
+    parser = PayloadParser([{'filter': 'sensors/#', 'type': 'json'}])
+    assert topics(parser.parse('sensors/room1/climate', '{"temp": 21.4}')) == \
+        ['sensors/room1/climate', 'sensors/room1/climate/temp']
+    assert topics(parser.parse('sensors/room1', '{"door": "open"}')) == ['sensors/room1', 'sensors/room1/door']
+    assert topics(parser.parse('sensors', '{"count": 2}')) == ['sensors', 'sensors/count']
+
+def test_json_hash_filter_real_topic_takes_over_field():
+    parser = PayloadParser([{'filter': 'sensors/#', 'type': 'json'}])
+    parser.parse('sensors/room1', '{"temp": 20}')
+    # The topic matches the rule, so it is a device of its own and not a field
+    assert topics(parser.parse('sensors/room1/temp', '{"value": 21}')) == ['sensors/room1/temp', 'sensors/room1/temp/value']
+    assert topics(parser.parse('sensors/room1', '{"temp": 22}')) == ['sensors/room1']
+
+def test_json_plus_filter_with_fields_drops_real_topic_on_field(caplog):
+    parser = PayloadParser([{'filter': 'site/+/line', 'type': 'json', 'fields': {'temp': 'temp'}}])
+    assert parser.parse('site/1/line', '{"temp": 3}') == \
+        [Field('site/1/line', '{"temp": 3}', None), Field('site/1/line/temp', '3', 3.0)]
+    with caplog.at_level(logging.WARNING):
+        assert parser.parse('site/1/line/temp', '5') == []
+        assert parser.parse('site/1/line/temp', '6') == []
+    # Warned once per topic
+    assert len([record for record in caplog.records if record.levelno == logging.WARNING]) == 1
+
+def test_json_plus_filter_field_on_real_topic_is_dropped(caplog):
+    parser = PayloadParser([{'filter': 'site/+/line', 'type': 'json', 'fields': {'temp': 'temp'}}])
+    assert parser.parse('site/1/line/temp', '5') == [Field('site/1/line/temp', '5', 5.0)]
+    with caplog.at_level(logging.WARNING):
+        assert topics(parser.parse('site/1/line', '{"temp": 3}')) == ['site/1/line']
+    assert any(record.levelno == logging.WARNING for record in caplog.records)
+
+def test_hash_filter_with_fields_keeps_real_topics_below_it():
+    parser = PayloadParser([{'filter': 'site/+/line/#', 'type': 'json', 'fields': {'temp': 'temp'}}])
+    assert topics(parser.parse('site/1/line/temp', '{"temp": 4}')) == ['site/1/line/temp', 'site/1/line/temp/temp']
+    assert topics(parser.parse('site/1/line/other', '{"temp": 5}')) == ['site/1/line/other', 'site/1/line/other/temp']
+
+def test_regex_plus_filter_only_named_groups_are_fields():
+    parser = PayloadParser([{'filter': 'plc/+', 'type': 'regex', 'pattern': 'T=(?P<temp>[-\\d.]+)'}])
+    assert topics(parser.parse('plc/1', 'T=4')) == ['plc/1', 'plc/1/temp']
+    assert parser.parse('plc/1/other', '5') == [Field('plc/1/other', '5', 5.0)]
+    assert parser.parse('plc/1/temp', '5') == []
+
+def test_unparsable_payload_is_counted():
+    parser = PayloadParser([{'filter': 'meters/#', 'type': 'numeric'}])
+    assert parser.parse('meters/1', 'on') == []
+    assert parser.parse('meters/1', ' 7 ') == [Field('meters/1', '7', 7.0)]
+    assert parser.errors == 1
+
+def test_shards_of_field_starts_with_parent_shard():
+    shard_map = ShardMap(['home/+', 'home/+/+'], 3, [{'filter': 'home/+', 'type': 'json'}])
+    parent = shard_map.shard_of('home/x')
+    assert shard_map.shards_of('home/x') == [parent]
+    assert shard_map.shards_of('home/x/temp')[0] == parent
+    assert shard_map.shard_of('home/x/temp') in shard_map.shards_of('home/x/temp')
+    assert shard_map.shards_of('other') == []
+
+def test_shards_of_topic_matching_rule_starts_with_own_shard():
+    shard_map = ShardMap(['home/+', 'home/+/+'], 3, [{'filter': 'home/#', 'type': 'json'}])
+    assert shard_map.shards_of('home/x/temp')[0] == shard_map.shard_of('home/x/temp')
+    assert shard_map.shard_of('home/x') in shard_map.shards_of('home/x/temp')
@@ -0,0 +1,21 @@
+from botmq.utility.values import TopicValues
+
+def test_set_reports_new_and_changed_values():
+    values = TopicValues()
+    assert values.set('a', '1', '1') == (True, True)
+    assert values.set('a', '1', '2') == (False, False)
+    assert values.set('a', 'on', '3') == (False, True)
+    assert values.get_number('a') is None
+    assert values.set('a', '2.5', '4') == (False, True)
+    assert values.get_number('a') == 2.5
+    assert values.version == '4'
+    # Values set from the stream are checked when received
+    assert values.take_changed() == set()
+
+def test_update_marks_only_changed_topics():
+    values = TopicValues()
+    assert values.update({'a': '1', 'b': '2'}, '1') == ['a', 'b']
+    assert values.take_changed() == {'a', 'b'}
+    assert values.update({'a': '1', 'b': '3', 'c': 'x'}, '2') == ['c']
+    assert values.take_changed() == {'b', 'c'}
+    assert values.numbers == {'a': 1.0, 'b': 3.0}